@@ -0,0 +1,240 @@
+#----------------------------------------------------------------------------#
+# Artists blueprint: the artist listing, search, detail page and forms.
+#----------------------------------------------------------------------------#
+
+import traceback
+from datetime import datetime
+
+from flask import Blueprint, abort, current_app, flash, g, jsonify, redirect, render_template, request, url_for
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload
+
+from extensions import db, page_cache, search_engine
+from helpers import artist_cache_keys, bulk_delete, conditional, delete_members, deletion_time, forget_deleted, genre_members, last_started, split_shows, stream_template, table_validators
+from models import Artist, Genre, Show, Venue, artist_genres
+from routing import read_only
+
+bp = Blueprint('artists', __name__)
+
+#----------------------------------------------------------------------------#
+# Page data.
+#----------------------------------------------------------------------------#
+
+def artists_query(genre=None):
+  query = db.session.query(Artist.id, Artist.name)
+  if genre:
+    query = query.filter(Artist.id.in_(genre_members(artist_genres, genre)))
+  return query.order_by(Artist.id)
+
+def artist_item(q):
+  return {'id': q.id, 'name': q.name}
+
+def artists_from_rows(rows):
+  return [artist_item(q) for q in rows]
+
+def artists_data(genre=None):
+  return artists_from_rows(artists_query(genre).all())
+
+def artist_data(artist_id):
+  # the artist, its shows and each show's venue come back in one joined
+  # query, and its genres in a second one
+  query = Artist.query.options(
+    joinedload(Artist.shows).joinedload(Show.venue),
+    selectinload(Artist.genres),
+  ).filter(Artist.id == artist_id).first()
+  if query is None:
+    return None
+
+  data = artist_fields(query, [g.name for g in query.genres])
+  data.update(split_shows(query.shows, lambda s: {
+    'venue_id': s.venue_id,
+    'venue_name': s.venue.name,
+    'venue_image_link': s.venue.image_link,
+  }))
+
+  return data
+
+def artist_fields(artist, genres):
+  # artist is an Artist or a row of the Artist table
+  data = {}
+  data['id'] = artist.id
+  data['name'] = artist.name
+  data['genres'] = sorted(genres)
+  data['city'] = artist.city
+  data['state'] = artist.state
+  data['phone'] = artist.phone
+  data['website'] = artist.website_link
+  data['facebook_link'] = artist.facebook_link
+  data['seeking_venue'] = artist.seeking_venue
+  data['seeking_description'] = artist.seeking_description
+  data['image_link'] = artist.image_link
+  return data
+
+#----------------------------------------------------------------------------#
+# Validators.
+#----------------------------------------------------------------------------#
+
+def artist_validators(artist_id):
+  return db.session.query(
+    func.max(Artist.updated_at), func.max(Show.updated_at), func.max(Venue.updated_at),
+    # the count catches a show deleted with its venue; the time of
+    # that deletion is what Last-Modified sees
+    func.count(Show.id), deletion_time(Show), last_started(),
+  ).outerjoin(Show, Show.artist_id == Artist.id).outerjoin(Venue, Show.venue_id == Venue.id
+  ).filter(Artist.id == artist_id).group_by(Artist.id)
+
+def artists_validators():
+  return table_validators(Artist)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+#  Artists
+#  ----------------------------------------------------------------
+@bp.route('/artists')
+@read_only
+@conditional(artists_validators)
+def artists():
+  # ?genre=Jazz lists only the artists tagged with that genre
+  genre = request.args.get('genre', '')
+  # on a cache miss the rows are rendered as they are read
+  data = page_cache.get_or_stream(page_cache.namespace('artists') + genre, lambda: (
+    artist_item(q) for q in artists_query(genre).yield_per(current_app.config['STREAM_BATCH_SIZE'])), g.get('etag'))
+  return stream_template('pages/artists.html', artists=data, genre=genre)
+
+@bp.route('/artists/search', methods=['POST'])
+@read_only
+def search_artists():
+  # partial, case-insensitive search on artist names, ranked and paginated.
+  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+  # search for "band" should return "The Wild Sax Band".
+  search_term = request.form.get('search_term', '')
+  page = request.form.get('page', 1, type=int)
+  per_page = current_app.config['SEARCH_PAGE_SIZE']
+  response = search_engine.search(Artist, Show.artist_id, search_term,
+    limit=per_page, offset=(max(page, 1) - 1) * per_page)
+  response['page'] = page
+  response['has_next'] = page * per_page < response['count']
+
+  return render_template('pages/search_artists.html', results=response, search_term=search_term)
+
+@bp.route('/artists/<int:artist_id>')
+@read_only
+@conditional(artist_validators)
+def show_artist(artist_id):
+  # shows the artist page with the given artist_id
+  data = page_cache.get_or_build('artist:{}'.format(artist_id), lambda: artist_data(artist_id), g.get('etag'))
+  if data is None:
+    abort(404)
+  return render_template('pages/show_artist.html', artist=data)
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  from forms import ArtistForm
+  form = ArtistForm()
+  artist = Artist.query.get(artist_id)
+  
+  # TODO: populate form with fields from artist with ID <artist_id>
+  return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  # TODO: take values from the form submitted, and update existing
+  # artist record with ID <artist_id> using the new attributes
+  try:
+    name = request.form['name']
+    city = request.form['city']
+    state = request.form['state']
+    phone = request.form['phone']
+    genres = Genre.from_names(request.form.getlist('genres'))
+    facebook_link = request.form['facebook_link']
+    artist = Artist.query.get(artist_id)
+    artist.name = name
+    artist.city = city
+    artist.state = state
+    artist.phone = phone
+    artist.genres = genres
+    artist.facebook_link = facebook_link
+    # set explicitly: a change to genres alone does not trigger onupdate
+    artist.updated_at = datetime.utcnow()
+    keys = artist_cache_keys(artist_id)
+    db.session.commit()
+    search_engine.invalidate(Artist)
+    page_cache.invalidate(*keys)
+    page_cache.invalidate_namespace('artists')
+    page_cache.invalidate_namespace('shows')
+    flash('artist ' + request.form['name'] + ' are successfully edited!')
+  except:
+    db.session.rollback()
+    flash('Error! artist ' + request.form['name'] + ' could not be edited!')
+  finally:
+    db.session.close()
+  
+  return redirect(url_for('.show_artist', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  from forms import ArtistForm
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  # called upon submitting the new artist listing form
+  # TODO: insert form data as a new Venue record in the db, instead
+  # TODO: modify data to be the data object returned from db insertion
+
+  try:
+    name = request.form['name']
+    city = request.form['city']
+    state = request.form['state']
+    phone = request.form['phone']
+    genres = Genre.from_names(request.form.getlist('genres'))
+    facebook_link = request.form['facebook_link']
+    artist = Artist(name = name, city = city, state = state, phone = phone, genres = genres, facebook_link = facebook_link)
+    db.session.add(artist)
+    db.session.commit()
+    search_engine.invalidate(Artist)
+    page_cache.invalidate_namespace('artists')
+    flash('Artist ' + request.form['name'] + ' was successfully listed!')
+  except:
+    db.session.rollback()
+    flash('Error! Artist ' + request.form['name'] + ' could not be listed!')
+  finally:
+    db.session.close()
+
+  # on successful db insert, flash success
+  #flash('Artist ' + request.form['name'] + ' was successfully listed!')
+  # TODO: on unsuccessful db insert, flash an error instead.
+  # e.g., flash('An error occurred. Artist ' + data.name + ' could not be listed.')
+  return render_template('pages/home.html')
+
+#  Delete Artist
+#  ----------------------------------------------------------------
+
+@bp.route('/artists/<int:artist_id>', methods=['DELETE'])
+def delete_artist(artist_id):
+  try:
+    name, = db.session.query(Artist.name).filter(Artist.id == artist_id).one()
+    _, keys = delete_members(Artist, [artist_id])
+    db.session.commit()
+    forget_deleted(Artist, keys)
+    flash('Artist ' + name + ' was successfully deleted!')
+  except:
+    db.session.rollback()
+    traceback.print_exc()
+    flash('Error! Artist could not be deleted!')
+    return jsonify({'success': False})
+  finally:
+    db.session.close()
+  return jsonify({'success': True})
+
+@bp.route('/artists', methods=['DELETE'])
+def delete_artists():
+  return bulk_delete(Artist)
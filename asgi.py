@@ -0,0 +1,326 @@
+#----------------------------------------------------------------------------#
+# Async serving mode.
+#
+#   uvicorn asgi:app
+#
+# serves the read views (venue and artist listings and pages, the show
+# listing and both searches) from an event loop, with their queries run
+# through an async driver: the `databases` package on asyncpg for Postgres,
+# or on aiosqlite for SQLite. A detail page fetches its row, its shows and
+# its genres concurrently. Every other route is handed to the Flask app
+# unchanged through WSGIMiddleware.
+#
+# The queries, validators, page cache and templates are the blueprints' own:
+# each blueprint builds a listing's query (venues_query) apart from shaping
+# its rows (venues_from_rows), so the query runs here unchanged. Pages
+# render inside a Flask request context, so url_for, flashed messages,
+# after_request hooks (metrics, the session cookie) and error pages behave
+# as they do under WSGI. The context is only pushed for code that does not
+# await: Flask's context locals are per thread, and every request on the
+# loop shares one.
+#
+# Needs the packages in requirements-async.txt.
+#----------------------------------------------------------------------------#
+
+import asyncio
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from databases import Database
+from flask import abort, g, make_response, render_template, request as flask_request, session
+from starlette.applications import Starlette
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.exceptions import HTTPException
+
+from app import create_app
+from artists import artist_fields, artist_validators, artists_from_rows, artists_query, artists_validators
+from extensions import db, page_cache, search_engine
+from helpers import decode_cursor, not_modified, set_validators, split_shows, validators_from_row
+from models import Artist, Genre, Show, Venue, artist_genres, venue_genres
+from routing import pinned_to_primary
+from shows import shows_from_rows, shows_query, shows_validators
+from venues import venue_fields, venue_validators, venues_from_rows, venues_query, venues_validators
+
+flask_app = create_app()
+config = flask_app.config
+# queries are built on the event loop, outside any Flask context
+db.app = flask_app
+
+
+def async_url(url):
+  # postgres:// is psycopg2's spelling; the databases package serves
+  # postgresql:// with asyncpg and sqlite:/// with aiosqlite
+  if url.startswith('postgres://'):
+    return 'postgresql://' + url[len('postgres://'):]
+  return url.replace('postgresql+psycopg2://', 'postgresql://', 1)
+
+
+def connect(url, prefix):
+  url = async_url(url)
+  if url.startswith('sqlite'):
+    return Database(url)
+  # one pool as large as the sync engine's, overflow included
+  return Database(url, min_size=1,
+                  max_size=config[prefix + '_POOL_SIZE'] + config[prefix + '_MAX_OVERFLOW'])
+
+
+primary = connect(config['ASYNC_DATABASE_URL'] or config['SQLALCHEMY_DATABASE_URI'], 'DATABASE')
+replica = None
+if config['ASYNC_REPLICA_URL'] or config['DATABASE_REPLICA_URL']:
+  replica = connect(config['ASYNC_REPLICA_URL'] or config['DATABASE_REPLICA_URL'], 'REPLICA')
+
+
+@lru_cache(maxsize=None)
+def row_type(fields):
+  return namedtuple('Row', [f or 'column' for f in fields], rename=True)
+
+
+def fetcher(request):
+  # fetch(query) for one request: the rows of a Query as named tuples, read
+  # from the replica unless the client has just written. Statements are
+  # counted and timed into fetch.metrics, which stands in for the
+  # RequestMetrics totals of a WSGI request.
+  pinned = replica is not None and pinned_to_primary(request.cookies)
+  database = primary if replica is None or pinned else replica
+  metrics = {
+    'start': time.perf_counter(),
+    'query_count': 0,
+    'db_time': 0.0,
+    'render_time': 0.0,
+    'slowest': [],
+  }
+
+  async def fetch(query):
+    start = time.perf_counter()
+    rows = await database.fetch_all(query.statement)
+    metrics['query_count'] += 1
+    metrics['db_time'] += time.perf_counter() - start
+    Row = row_type(tuple(d['name'] for d in query.column_descriptions))
+    return [Row(*(row[i] for i in range(len(Row._fields)))) for row in rows]
+
+  fetch.dialect = database.url.dialect
+  # for page_cache: see DataCache.get_or_build_async
+  fetch.pinned = pinned
+  fetch.lagging = database is replica
+  fetch.metrics = metrics
+  return fetch
+
+
+def flask_context(request, body=b''):
+  return flask_app.test_request_context(
+    request.url.path, base_url=str(request.base_url), query_string=request.url.query,
+    method=request.method, headers=list(request.headers.items()), data=body)
+
+
+def finish(request, fetch, view, body=b''):
+  # calls view() inside a Flask request context and returns its response,
+  # passed through the app's after_request hooks
+  with flask_context(request, body):
+    g.metrics = fetch.metrics
+    try:
+      response = make_response(view())
+    except HTTPException as e:
+      response = make_response(flask_app.handle_http_exception(e))
+    response = flask_app.process_response(response)
+  if request.method != 'HEAD':
+    response = flask_app.extensions['compress'].compress_response(response, request.headers.get('accept-encoding'))
+  asgi_response = Response(response.get_data(), status_code=response.status_code)
+  # records the request's metrics, as the WSGI server's close would
+  response.close()
+  # raw, so repeated headers such as Set-Cookie survive
+  asgi_response.raw_headers = [(k.lower().encode('latin-1'), v.encode('latin-1'))
+                               for k, v in response.headers.items()]
+  return asgi_response
+
+
+async def page(request, validator, key, load, render):
+  # the async counterpart of @conditional plus page_cache.get_or_build:
+  # answers 304 from validator's query when the client's copy is current,
+  # otherwise renders the data load(fetch) returns (cached under key)
+  fetch = fetcher(request)
+  rows = await fetch(validator)
+  validators = validators_from_row(rows[0] if rows else None)
+  if validators is None:
+    return finish(request, fetch, lambda: abort(404))
+  unchanged = None
+  with flask_context(request):
+    # as in helpers.conditional()
+    if '_flashes' in session:
+      validators = None
+    else:
+      unchanged = not_modified(*validators)
+  if unchanged is not None:
+    return finish(request, fetch, lambda: unchanged)
+
+  data = await page_cache.get_or_build_async(key, lambda: load(fetch), validators and validators[0],
+                                             fetch.pinned, fetch.lagging)
+
+  def view():
+    if data is None:
+      abort(404)
+    response = make_response(render(data))
+    if validators is not None:
+      set_validators(response, *validators)
+    return response
+  return finish(request, fetch, view)
+
+#----------------------------------------------------------------------------#
+# Page data.
+#
+# The detail pages use three plain queries run side by side instead of the
+# joined loads of venue_data and artist_data.
+#----------------------------------------------------------------------------#
+
+async def venue_data(fetch, venue_id):
+  venue, shows, genres = await asyncio.gather(
+    fetch(db.session.query(*Venue.__table__.c).filter(Venue.id == venue_id)),
+    fetch(db.session.query(
+      Show.start_time, Show.artist_id,
+      Artist.name.label('artist_name'), Artist.image_link.label('artist_image_link'),
+    ).join(Artist, Show.artist_id == Artist.id).filter(Show.venue_id == venue_id)),
+    fetch(genre_names(venue_genres, venue_id)),
+  )
+  if not venue:
+    return None
+  data = venue_fields(venue[0], [g.name for g in genres])
+  data.update(split_shows(shows, lambda s: {
+    'artist_id': s.artist_id,
+    'artist_name': s.artist_name,
+    'artist_image_link': s.artist_image_link,
+  }))
+  return data
+
+
+async def artist_data(fetch, artist_id):
+  artist, shows, genres = await asyncio.gather(
+    fetch(db.session.query(*Artist.__table__.c).filter(Artist.id == artist_id)),
+    fetch(db.session.query(
+      Show.start_time, Show.venue_id,
+      Venue.name.label('venue_name'), Venue.image_link.label('venue_image_link'),
+    ).join(Venue, Show.venue_id == Venue.id).filter(Show.artist_id == artist_id)),
+    fetch(genre_names(artist_genres, artist_id)),
+  )
+  if not artist:
+    return None
+  data = artist_fields(artist[0], [g.name for g in genres])
+  data.update(split_shows(shows, lambda s: {
+    'venue_id': s.venue_id,
+    'venue_name': s.venue_name,
+    'venue_image_link': s.venue_image_link,
+  }))
+  return data
+
+
+def genre_names(association, member_id):
+  member = [c for c in association.c if c.name != 'genre_id'][0]
+  return db.session.query(Genre.name).join(
+    association, association.c.genre_id == Genre.id).filter(member == member_id)
+
+#----------------------------------------------------------------------------#
+# Views.
+#----------------------------------------------------------------------------#
+
+async def venues(request):
+  genre = request.query_params.get('genre', '')
+
+  async def load(fetch):
+    return venues_from_rows(await fetch(venues_query(genre)))
+  return await page(request, venues_validators(), page_cache.namespace('venues') + genre, load,
+                    lambda data: render_template('pages/venues.html', areas=data, genre=genre))
+
+
+async def show_venue(request):
+  venue_id = request.path_params['venue_id']
+  return await page(request, venue_validators(venue_id), 'venue:{}'.format(venue_id),
+                    lambda fetch: venue_data(fetch, venue_id),
+                    lambda data: render_template('pages/show_venue.html', venue=data))
+
+
+async def artists(request):
+  genre = request.query_params.get('genre', '')
+
+  async def load(fetch):
+    return artists_from_rows(await fetch(artists_query(genre)))
+  return await page(request, artists_validators(), page_cache.namespace('artists') + genre, load,
+                    lambda data: render_template('pages/artists.html', artists=data, genre=genre))
+
+
+async def show_artist(request):
+  artist_id = request.path_params['artist_id']
+  return await page(request, artist_validators(artist_id), 'artist:{}'.format(artist_id),
+                    lambda fetch: artist_data(fetch, artist_id),
+                    lambda data: render_template('pages/show_artist.html', artist=data))
+
+
+async def shows(request):
+  # the cursor is decoded in a Flask context so a bad one is a 400 page
+  error = None
+  with flask_context(request):
+    past = flask_request.args.get('past', 0, type=int) == 1
+    cursor = flask_request.args.get('after')
+    try:
+      after = decode_cursor(cursor)
+    except HTTPException as e:
+      error = e
+  if error is not None:
+    return finish(request, fetcher(request), lambda: abort(error.code))
+  key = page_cache.namespace('shows') + '{}:{}'.format(int(past), cursor or '')
+  per_page = config['SHOWS_PAGE_SIZE']
+
+  async def load(fetch):
+    return shows_from_rows(await fetch(shows_query(past, after, per_page)), per_page)
+  return await page(request, shows_validators(), key, load,
+                    lambda data: render_template('pages/shows.html', shows=data[0], past=past, next_cursor=data[1]))
+
+
+async def search(request, model, show_fk, template):
+  body = await request.body()
+  fetch = fetcher(request)
+  with flask_context(request, body):
+    search_term = flask_request.form.get('search_term', '')
+    page = flask_request.form.get('page', 1, type=int)
+  per_page = config['SEARCH_PAGE_SIZE']
+  response = await search_engine.search_async(fetch, fetch.dialect, model, show_fk, search_term,
+    limit=per_page, offset=(max(page, 1) - 1) * per_page)
+  response['page'] = page
+  response['has_next'] = page * per_page < response['count']
+  return finish(request, fetch, lambda: render_template(template, results=response, search_term=search_term), body)
+
+
+async def search_venues(request):
+  return await search(request, Venue, Show.venue_id, 'pages/search_venues.html')
+
+
+async def search_artists(request):
+  return await search(request, Artist, Show.artist_id, 'pages/search_artists.html')
+
+#----------------------------------------------------------------------------#
+# Launch.
+#----------------------------------------------------------------------------#
+
+async def startup():
+  await primary.connect()
+  if replica is not None:
+    await replica.connect()
+
+
+async def shutdown():
+  await primary.disconnect()
+  if replica is not None:
+    await replica.disconnect()
+
+
+app = Starlette(routes=[
+  Route('/venues', venues),
+  Route('/venues/search', search_venues, methods=['POST']),
+  Route('/venues/{venue_id:int}', show_venue),
+  Route('/artists', artists),
+  Route('/artists/search', search_artists, methods=['POST']),
+  Route('/artists/{artist_id:int}', show_artist),
+  Route('/shows', shows),
+  # everything else, static files included, is served by Flask
+  Mount('/', WSGIMiddleware(flask_app)),
+], on_startup=[startup], on_shutdown=[shutdown])
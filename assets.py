@@ -0,0 +1,177 @@
+#----------------------------------------------------------------------------#
+# Static asset bundles.
+#
+# `flask assets` concatenates the CSS and JS files of each bundle in
+# BUNDLES, minifies them, and writes them to static/dist/ under a name
+# carrying a hash of their content (main.3f9c2a71d0.css), next to gzip and,
+# when the brotli package is installed, brotli copies. manifest.json maps
+# each bundle to its current file.
+#
+# Templates link to bundles with asset_urls() and to single files with
+# static_url(). Without a build both fall back to the source files, so
+# development needs no build step. A fingerprinted file under static/dist/
+# never changes once written, so it is served with a year-long immutable
+# Cache-Control, in the best encoding the client accepts; manifest.json is
+# rewritten by every build and must be revalidated.
+#----------------------------------------------------------------------------#
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory, url_for
+
+OUTPUT = 'dist'
+MANIFEST = 'manifest.json'
+MAX_AGE = 365 * 24 * 60 * 60
+# the content hash in a built file's name, as build() writes it
+FINGERPRINT = re.compile(r'\.[0-9a-f]{10}\.\w+$')
+
+# bundle name -> source files under static/, in load order. The CSS bundle
+# is written one directory below static/, like its sources, so relative
+# url()s still resolve.
+BUNDLES = {
+  'main.css': [
+    'css/bootstrap.min.css',
+    'css/layout.main.css',
+    'css/main.css',
+    'css/main.responsive.css',
+    'css/main.quickfix.css',
+  ],
+  'head.js': [
+    'js/libs/modernizr-2.8.2.min.js',
+    'js/libs/moment.min.js',
+  ],
+  # deferred, after jQuery
+  'app.js': [
+    'js/script.js',
+    'js/libs/bootstrap-3.1.1.min.js',
+    'js/plugins.js',
+  ],
+}
+
+# content-encoding -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def minify_css(css):
+  # drops comments and the whitespace around punctuation, leaving quoted
+  # strings as they are
+  out = []
+  for string, text in re.findall(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|([^"\']+)', css, re.S):
+    if string:
+      out.append(string)
+      continue
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r' ?([{};,>]) ?', r'\1', text)
+    text = re.sub(r' ?: ?(?=[^{}]*;|[^{}]*})', ':', text)
+    out.append(text.replace(';}', '}'))
+  return ''.join(out).strip()
+
+
+def minify_js(js):
+  # JavaScript needs a real tokenizer to minify safely; rjsmin is used when
+  # installed, otherwise the (mostly pre-minified) sources are only joined
+  try:
+    import rjsmin
+  except ImportError:
+    return js
+  return rjsmin.jsmin(js)
+
+
+def compress(data):
+  # {suffix: bytes} for each encoding available here
+  variants = {'.gz': gzip.compress(data, 9, mtime=0)}
+  try:
+    import brotli
+  except ImportError:
+    return variants
+  variants['.br'] = brotli.compress(data)
+  return variants
+
+
+def build(static_folder, bundles=BUNDLES):
+  # writes every bundle and its compressed copies, then the manifest, and
+  # returns the manifest
+  output = os.path.join(static_folder, OUTPUT)
+  os.makedirs(output, exist_ok=True)
+  manifest = {}
+  for name, sources in sorted(bundles.items()):
+    parts = []
+    for source in sources:
+      with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+        parts.append(f.read())
+    if name.endswith('.css'):
+      data = '\n'.join(minify_css(p) for p in parts)
+    else:
+      # a statement ending without a semicolon must not run into the next file
+      data = '\n;'.join(minify_js(p) for p in parts)
+    data = data.encode('utf-8')
+    stem, ext = os.path.splitext(name)
+    filename = '{}.{}{}'.format(stem, hashlib.sha1(data).hexdigest()[:10], ext)
+    for suffix, content in [('', data)] + sorted(compress(data).items()):
+      with open(os.path.join(output, filename + suffix), 'wb') as f:
+        f.write(content)
+    manifest[name] = filename
+  with open(os.path.join(output, MANIFEST), 'w') as f:
+    json.dump(manifest, f, indent=2, sort_keys=True)
+  return manifest
+
+
+class Assets(object):
+
+  def __init__(self, app=None):
+    self.manifest = {}
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    self.output = os.path.join(app.static_folder, OUTPUT)
+    self.load()
+    app.add_url_rule('/static/{}/<path:filename>'.format(OUTPUT), 'asset', self.send)
+    app.jinja_env.globals.update(asset_urls=self.urls, static_url=self.static_url)
+
+  def load(self):
+    try:
+      with open(os.path.join(self.output, MANIFEST)) as f:
+        self.manifest = json.load(f)
+    except (IOError, ValueError):
+      self.manifest = {}
+
+  def urls(self, bundle):
+    # the built bundle, or its source files before a build
+    if bundle in self.manifest:
+      return [url_for('asset', filename=self.manifest[bundle])]
+    return [url_for('static', filename=source) for source in BUNDLES[bundle]]
+
+  def static_url(self, filename):
+    # a single file under static/; built bundles are found by their name
+    if filename in self.manifest:
+      return url_for('asset', filename=self.manifest[filename])
+    return url_for('static', filename=filename)
+
+  def send(self, filename):
+    # the precompressed copy in the best encoding the client accepts
+    encoding = None
+    served = filename
+    for name, suffix in ENCODINGS:
+      if request.accept_encodings[name] and os.path.isfile(os.path.join(self.output, filename + suffix)):
+        encoding, served = name, filename + suffix
+        break
+    fingerprinted = FINGERPRINT.search(filename) is not None
+    response = send_from_directory(
+      self.output, served, mimetype=mimetypes.guess_type(filename)[0],
+      cache_timeout=MAX_AGE if fingerprinted else 0, conditional=True)
+    if encoding:
+      response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    if fingerprinted:
+      response.headers['Cache-Control'] = 'public, max-age={}, immutable'.format(MAX_AGE)
+    else:
+      # kept, but checked against its ETag before every use
+      response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,160 @@
+#----------------------------------------------------------------------------#
+# Query-layer microbenchmarks.
+#
+# Times each view's data-building function directly, bypassing the page
+# cache, and counts the SQL statements it issues; template rendering is
+# timed separately on synthetic data, and a worker's cold start in fresh
+# interpreters. Results are written as JSON so runs on different commits
+# can be compared with `flask bench --compare old.json`.
+#----------------------------------------------------------------------------#
+
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+
+class QueryCounter(object):
+
+  def __init__(self, engine):
+    self.engine = engine
+    self.count = 0
+
+  def __enter__(self):
+    event.listen(self.engine, 'before_cursor_execute', self._count)
+    return self
+
+  def __exit__(self, *exc):
+    event.remove(self.engine, 'before_cursor_execute', self._count)
+
+  def _count(self, *args):
+    self.count += 1
+
+
+def time_call(engine, fn, repeat):
+  # returns wall times in milliseconds and the query count of the last run
+  timings = []
+  for _ in range(repeat):
+    with QueryCounter(engine) as counter:
+      start = time.perf_counter()
+      fn()
+      timings.append((time.perf_counter() - start) * 1000)
+  return timings, counter.count
+
+
+def summarize(timings):
+  timings = sorted(timings)
+  return {
+    'min_ms': round(timings[0], 3),
+    'median_ms': round(timings[len(timings) // 2], 3),
+    'max_ms': round(timings[-1], 3),
+  }
+
+
+# run in a fresh interpreter by startup(): imports the app module, creates
+# the app and requests one page, printing the times as JSON
+STARTUP_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+queries = []
+event.listen(Engine, 'before_cursor_execute', lambda *args: queries.append(1))
+flask_app = app.create_app()
+created = time.perf_counter()
+status = flask_app.test_client().get(sys.argv[1]).status_code
+done = time.perf_counter()
+print(json.dumps({
+  'import': (imported - start) * 1000,
+  'create_app': (created - imported) * 1000,
+  'first_response': (done - start) * 1000,
+  'queries': len(queries),
+  'status': status,
+}))
+'''
+
+
+def startup(root, path='/', repeat=5):
+  # cold-start benchmarks, as run() results: the time to import the app
+  # module, to create the app, and from the start of the import to the
+  # first response for path. Every run is a new interpreter in root, so
+  # nothing is imported or cached in memory beforehand.
+  runs = []
+  for _ in range(repeat):
+    output = subprocess.check_output([sys.executable, '-c', STARTUP_SCRIPT, path], cwd=root)
+    runs.append(json.loads(output.decode().strip().splitlines()[-1]))
+  if runs[-1]['status'] >= 500:
+    raise RuntimeError('{} answered {} on a cold start'.format(path, runs[-1]['status']))
+  results = {}
+  for step in ('import', 'create_app', 'first_response'):
+    results['startup_' + step] = dict(
+      summarize([r[step] for r in runs]),
+      queries=runs[-1]['queries'] if step == 'first_response' else 0,
+      repeat=repeat)
+  return results
+
+
+def current_commit():
+  try:
+    return subprocess.check_output(
+      ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL
+    ).decode().strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def run(engine, benchmarks, repeat=5, before_each=None, context=None):
+  # benchmarks is a list of (name, fn), or (name, fn, items) when fn handles
+  # a known number of items (e.g. show tiles), which adds the median cost
+  # per item. before_each, if given, runs before every call outside the
+  # timing (e.g. to expire the ORM session).
+  results = {}
+  for name, fn, *items in benchmarks:
+    def call(fn=fn):
+      if before_each:
+        before_each()
+      return fn()
+    fn()  # warm up connections and compiled statement caches
+    timings, queries = time_call(engine, call, repeat)
+    results[name] = dict(summarize(timings), queries=queries, repeat=repeat)
+    if items:
+      results[name]['per_item_us'] = round(results[name]['median_ms'] * 1000 / items[0], 3)
+  return {
+    'commit': current_commit(),
+    'created_at': datetime.utcnow().isoformat() + 'Z',
+    'python': platform.python_version(),
+    'database': engine.dialect.name,
+    'context': context or {},
+    'results': results,
+  }
+
+
+def compare(old, new):
+  # lines describing the change of each benchmark between two result sets
+  lines = []
+  for name, result in sorted(new['results'].items()):
+    before = old['results'].get(name)
+    if before is None:
+      lines.append('{:<28} {:>10.3f} ms {:>5} queries (new)'.format(
+        name, result['median_ms'], result['queries']))
+      continue
+    change = (result['median_ms'] - before['median_ms']) / (before['median_ms'] or 1) * 100
+    lines.append('{:<28} {:>10.3f} ms ({:+6.1f}%) {:>5} queries ({:+d})'.format(
+      name, result['median_ms'], change, result['queries'], result['queries'] - before['queries']))
+  return lines
+
+
+def save(results, path):
+  with open(path, 'w') as f:
+    json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load(path):
+  with open(path) as f:
+    return json.load(f)
@@ -0,0 +1,241 @@
+#----------------------------------------------------------------------------#
+# Page data cache.
+#
+# Read views cache the dicts they hand to their templates under keys such as
+# 'venue:3' or 'venues', and the write handlers delete exactly the keys their
+# change affects. Whole families of keys (every page of /shows) live in a
+# namespace whose generation number is part of the key, so bumping the
+# generation drops all of them at once.
+#
+# With a read replica, data built from it may be older than the writes that
+# invalidated its key. A request pinned to the primary (see routing.py)
+# neither reads nor writes the cache, and for REPLICA_STICKY_SECONDS after
+# any invalidation data read from the replica is served but not cached.
+#
+# Backends: LRUCache keeps entries in process memory, bounded in size and
+# age; RedisCache shares them between workers through any client with the
+# redis-py get/set/delete/incr interface.
+#----------------------------------------------------------------------------#
+
+import math
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+# until when replica reads are not cached, as a time.time() value
+HOLD_KEY = 'replica-hold'
+
+
+class LRUCache(object):
+
+  def __init__(self, maxsize=1024, ttl=60):
+    self.maxsize = maxsize
+    self.ttl = ttl
+    self._entries = OrderedDict()
+    self._counters = {}
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return MISSING
+      expires, value = entry
+      if expires < time.time():
+        del self._entries[key]
+        return MISSING
+      self._entries.move_to_end(key)
+      return value
+
+  def set(self, key, value, ttl=None):
+    with self._lock:
+      self._entries[key] = (time.time() + (ttl or self.ttl), value)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.maxsize:
+        self._entries.popitem(last=False)
+
+  def delete(self, *keys):
+    with self._lock:
+      for key in keys:
+        self._entries.pop(key, None)
+
+  def counter(self, key):
+    return self._counters.get(key, 0)
+
+  def incr(self, key):
+    # counters are kept apart from the entries so they are never evicted
+    with self._lock:
+      self._counters[key] = self._counters.get(key, 0) + 1
+      return self._counters[key]
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+      self._counters.clear()
+
+
+class RedisCache(object):
+
+  def __init__(self, client, ttl=60, prefix='fyyur:'):
+    self.client = client
+    self.ttl = ttl
+    self.prefix = prefix
+
+  @classmethod
+  def from_url(cls, url, **kwargs):
+    import redis
+    return cls(redis.Redis.from_url(url), **kwargs)
+
+  def get(self, key):
+    value = self.client.get(self.prefix + key)
+    if value is None:
+      return MISSING
+    return pickle.loads(value)
+
+  def set(self, key, value, ttl=None):
+    self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or self.ttl)
+
+  def delete(self, *keys):
+    if keys:
+      self.client.delete(*[self.prefix + key for key in keys])
+
+  def counter(self, key):
+    return int(self.client.get(self.prefix + key) or 0)
+
+  def incr(self, key):
+    return self.client.incr(self.prefix + key)
+
+  def clear(self):
+    keys = list(self.client.scan_iter(self.prefix + '*'))
+    if keys:
+      self.client.delete(*keys)
+
+
+class DataCache(object):
+
+  def __init__(self, backend=None, pinned=None, lagging=None):
+    # pinned() and lagging() say whether the current request reads the
+    # primary after a write, and whether it reads the replica
+    self.backend = backend
+    self.pinned = pinned
+    self.lagging = lagging
+    self.hold = 0
+    self.hits = 0
+    self.misses = 0
+
+  def init_app(self, app):
+    self.backend = create_backend(app.config)
+    self.hold = app.config['REPLICA_STICKY_SECONDS']
+
+  def _access(self, pinned=None, lagging=None):
+    # (read, write): whether the current request may use cached data and
+    # cache what it builds. asgi.py passes pinned and lagging itself.
+    if pinned is None:
+      pinned = self.pinned is not None and self.pinned()
+    if pinned:
+      return False, False
+    if lagging is None:
+      lagging = self.lagging is not None and self.lagging()
+    return True, not (lagging and self._holding())
+
+  def _holding(self):
+    until = self.backend.get(HOLD_KEY)
+    return until is not MISSING and until > time.time()
+
+  def _hold(self):
+    if self.hold:
+      self.backend.set(HOLD_KEY, time.time() + self.hold, ttl=int(math.ceil(self.hold)))
+
+  def _lookup(self, key, version=None, read=True):
+    # the value cached under key, or MISSING. Entries are stored with the
+    # version (the page's ETag) of the request that built them; one built
+    # for another version is a miss, so a body built before a write is not
+    # served under the ETag computed after it. Without a version (a page
+    # that shows a flash message, which @conditional does not validate)
+    # there is nothing to check an entry against: it is built fresh.
+    entry = self.backend.get(key) if read and version is not None else MISSING
+    if entry is not MISSING and entry[0] == version:
+      self.hits += 1
+      return entry[1]
+    self.misses += 1
+    return MISSING
+
+  def _store(self, key, value, version=None):
+    # an entry without a version could never be read back
+    if version is not None:
+      self.backend.set(key, (version, value))
+
+  def get_or_build(self, key, build, version=None):
+    # returns the cached value for key, or build()'s result after caching
+    # it. None (e.g. an unknown id) is returned but never cached.
+    read, write = self._access()
+    value = self._lookup(key, version, read)
+    if value is not MISSING:
+      return value
+    value = build()
+    if value is not None and write:
+      self._store(key, value, version)
+    return value
+
+  def get_or_stream(self, key, build, version=None):
+    # get_or_build for a list that build() produces as an iterator: on a
+    # miss the items are handed on as they arrive, and the list is cached
+    # once the iterator is exhausted (not if the consumer stops early)
+    read, write = self._access()
+    value = self._lookup(key, version, read)
+    if value is not MISSING:
+      return value
+    return self._stream(key, build(), version, write)
+
+  def _stream(self, key, items, version, write):
+    kept = []
+    for item in items:
+      kept.append(item)
+      yield item
+    if write:
+      self._store(key, kept, version)
+
+  async def get_or_build_async(self, key, build, version=None, pinned=False, lagging=False):
+    # get_or_build for asgi.py, where build() returns an awaitable and
+    # there is no Flask request to tell where the data is read from
+    read, write = self._access(pinned, lagging)
+    value = self._lookup(key, version, read)
+    if value is not MISSING:
+      return value
+    value = await build()
+    if value is not None and write:
+      self._store(key, value, version)
+    return value
+
+  def invalidate(self, *keys):
+    self.backend.delete(*keys)
+    self._hold()
+
+  def namespace(self, name):
+    # key prefix for a family of keys, e.g. 'shows:4:'
+    return '{}:{}:'.format(name, self.backend.counter(name + ':generation'))
+
+  def invalidate_namespace(self, name):
+    self.backend.incr(name + ':generation')
+    self._hold()
+
+  def stats(self):
+    total = self.hits + self.misses
+    return {
+      'backend': type(self.backend).__name__,
+      'hits': self.hits,
+      'misses': self.misses,
+      'hit_ratio': float(self.hits) / total if total else 0.0,
+    }
+
+
+def create_backend(config):
+  if config.get('CACHE_BACKEND') == 'redis':
+    return RedisCache.from_url(config['CACHE_REDIS_URL'], ttl=config['CACHE_TTL'])
+  return LRUCache(maxsize=config['CACHE_MAXSIZE'], ttl=config['CACHE_TTL'])
+
+
+def create_cache(config):
+  return DataCache(create_backend(config))
@@ -0,0 +1,225 @@
+#----------------------------------------------------------------------------#
+# Commands.
+#
+# Registered on the app by create_app(). Each command imports the modules
+# it needs when it runs, so `flask --help` and `flask db` do not load the
+# seeder, the importer or the benchmarks.
+#----------------------------------------------------------------------------#
+
+import os
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, render_template
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import func
+
+from extensions import assets, db, page_cache, search_engine, show_counters
+from models import Artist, DeletionCounter, Show, Venue
+from schedule import sweep
+
+@click.command('explain')
+@with_appcontext
+def explain_command():
+  """Fail if a read route's queries read the whole Show table or index."""
+  from explain import check_query_plans
+  ids = {
+    'venue_id': db.session.query(func.min(Venue.id)).scalar() or 1,
+    'artist_id': db.session.query(func.min(Artist.id)).scalar() or 1,
+  }
+  failures = check_query_plans(current_app._get_current_object(), db.engine, ids)
+  for route, statement, plan in failures:
+    click.echo('{}\n{}\n  {}\n'.format(route, statement, '\n  '.join(plan)))
+  if failures:
+    raise SystemExit(1)
+  click.echo('No full scans of "Show".')
+
+@click.group('counters', cls=AppGroup)
+def counters_group():
+  """Maintain the upcoming/past show counts on venues and artists."""
+
+@counters_group.command('roll')
+def counters_roll_command():
+  """Move shows that have started from the upcoming to the past counts."""
+  with db.engine.begin() as conn:
+    moved = show_counters.roll(conn)
+  click.echo('{} shows rolled into the past counts.'.format(moved))
+
+@counters_group.command('verify')
+@click.option('--fix', is_flag=True, help='Recompute the counts that have drifted.')
+def counters_verify_command(fix):
+  """Recompute the show counts and report the ones that have drifted."""
+  # the check does not lock out writers, so a show added while it runs can
+  # be reported; --fix recomputes under the watermark lock either way
+  with db.engine.begin() as conn:
+    drift = show_counters.verify(conn)
+    for table, id, stored, actual in drift:
+      click.echo('{} {}: upcoming {}, past {}; expected upcoming {}, past {}'.format(
+        table, id, stored[0], stored[1], actual[0], actual[1]))
+    if drift and fix:
+      show_counters.repair(conn, [(table, id) for table, id, _, _ in drift])
+  if not drift:
+    click.echo('No drift.')
+  elif fix:
+    page_cache.invalidate_namespace('venues')
+    click.echo('{} rows repaired.'.format(len(drift)))
+  else:
+    raise SystemExit(1)
+
+@click.command('assets')
+@with_appcontext
+def assets_command():
+  """Build the minified, fingerprinted and compressed CSS/JS bundles."""
+  from assets import build as build_assets
+  manifest = build_assets(current_app.static_folder)
+  assets.load()
+  for name, filename in sorted(manifest.items()):
+    path = os.path.join(assets.output, filename)
+    sizes = ['{} {}'.format(os.path.getsize(path + suffix), suffix or 'bytes')
+             for suffix in ('', '.gz', '.br') if os.path.exists(path + suffix)]
+    click.echo('{:<10} {:<26} {}'.format(name, filename, ', '.join(sizes)))
+
+@click.command('conflicts')
+@with_appcontext
+def conflicts_command():
+  """List overlapping shows at a venue or by an artist."""
+  found = 0
+  with db.engine.connect() as conn:
+    for key, member_id, earlier, later in sweep(conn, Show.__table__):
+      click.echo('{} {}: show {} overlaps show {}'.format(key[:-len('_id')], member_id, later, earlier))
+      found += 1
+  if found:
+    raise SystemExit(1)
+  click.echo('No overlapping shows.')
+
+@click.command('seed')
+@click.option('--venues', default=1000, show_default=True)
+@click.option('--artists', default=5000, show_default=True)
+@click.option('--shows', default=100000, show_default=True)
+@click.option('--seed', 'random_seed', default=0, show_default=True, help='Random seed; the same seed gives the same data.')
+@click.option('--reset', is_flag=True, help='Delete all venues, artists, shows and genres first.')
+@with_appcontext
+def seed_command(venues, artists, shows, random_seed, reset):
+  """Fill the database with a reproducible synthetic dataset."""
+  from seed import SeedError, seed_database
+  start = time.time()
+  tables = dict((t.name, t) for t in db.metadata.sorted_tables)
+  try:
+    written = seed_database(db.engine, tables, venues, artists, shows, random_seed, reset)
+  except SeedError as e:
+    # nothing was written: the seed runs in one transaction
+    raise click.UsageError(str(e))
+  if reset:
+    with db.engine.begin() as conn:
+      DeletionCounter.record(conn, 'Venue', 'Artist', 'Show')
+  page_cache.backend.clear()
+  for table, count in sorted(written.items()):
+    click.echo('{:<12} {:>9} rows'.format(table, count))
+  click.echo('done in {:.1f}s'.format(time.time() - start))
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'format', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension.')
+@click.option('--chunk-size', default=5000, show_default=True)
+@click.option('--rejects', type=click.File('w'), default='-', show_default=True, help='Where to write rejected records as NDJSON.')
+@with_appcontext
+def import_command(kind, path, format, chunk_size, rejects):
+  """Bulk-load venues, artists or shows from a CSV or NDJSON file."""
+  from importer import Importer, read_records
+  start = time.time()
+  tables = dict((t.name, t) for t in db.metadata.sorted_tables)
+  importer = Importer(db.engine, tables, chunk_size, rejects, show_counters)
+  stats = importer.run(kind, read_records(path, format))
+  elapsed = time.time() - start
+  page_cache.backend.clear()
+  search_engine.invalidate(Venue)
+  search_engine.invalidate(Artist)
+  click.echo('{} {} inserted, {} rejected in {:.1f}s ({:.0f} rows/min)'.format(
+    stats['inserted'], kind, stats['rejected'], elapsed,
+    stats['inserted'] / elapsed * 60 if elapsed else 0), err=True)
+
+@click.command('bench')
+@click.option('--repeat', default=5, show_default=True)
+@click.option('--output', type=click.Path(), help='Where to write the JSON results (default: benchmarks/<commit>.json).')
+@click.option('--compare', 'baseline', type=click.Path(exists=True), help='Earlier results to compare against.')
+@click.option('--render-tiles', default=10000, show_default=True, help='Show tiles on the synthetic page for the render benchmarks.')
+@click.option('--startup-path', default='/venues', show_default=True, help='Page requested by the cold-start benchmarks.')
+@with_appcontext
+def bench_command(repeat, output, baseline, render_tiles, startup_path):
+  """Time each view's data-building code and count its queries."""
+  import bench
+  from artists import artist_data, artists_data
+  from helpers import format_datetime
+  from shows import shows_data
+  from venues import venue_data, venues_data
+  busiest_venue = db.session.query(Show.venue_id).group_by(Show.venue_id).order_by(func.count().desc()).limit(1).scalar()
+  busiest_artist = db.session.query(Show.artist_id).group_by(Show.artist_id).order_by(func.count().desc()).limit(1).scalar()
+  benchmarks = [
+    ('venues', venues_data),
+    ('venues_by_genre', lambda: venues_data('Jazz')),
+    ('show_venue', lambda: venue_data(busiest_venue)),
+    ('artists', artists_data),
+    ('artists_by_genre', lambda: artists_data('Jazz')),
+    ('show_artist', lambda: artist_data(busiest_artist)),
+    ('shows', lambda: shows_data(False, None)),
+    ('shows_past', lambda: shows_data(True, None)),
+    ('search_venues', lambda: search_engine.search(Venue, Show.venue_id, 'a', limit=current_app.config['SEARCH_PAGE_SIZE'])),
+    ('search_artists', lambda: search_engine.search(Artist, Show.artist_id, 'band', limit=current_app.config['SEARCH_PAGE_SIZE'])),
+  ]
+
+  # rendering, on a synthetic page of show tiles so it does not depend on
+  # the data; the string filter run is the old strftime/dateutil round trip
+  tiles = [{
+    'venue_id': 1, 'venue_name': 'The Musical Hop',
+    'artist_id': 1, 'artist_name': 'Guns N Petals', 'artist_image_link': '',
+    'start_time': datetime(2026, 1, 1, 20, 0) + timedelta(hours=i),
+  } for i in range(render_tiles)]
+  strings = [t['start_time'].strftime("%m/%d/%Y, %H:%M:%S") for t in tiles]
+  def render_shows():
+    with current_app.test_request_context('/shows'):
+      return render_template('pages/shows.html', shows=tiles, past=False, next_cursor=None)
+  benchmarks += [
+    ('render_shows', render_shows, render_tiles),
+    ('datetime_filter', lambda: [format_datetime(t['start_time'], 'full') for t in tiles], render_tiles),
+    ('datetime_filter_strings', lambda: [format_datetime(t, 'full') for t in strings], render_tiles),
+  ]
+  context = {
+    'venues': Venue.query.count(),
+    'artists': Artist.query.count(),
+    'shows': Show.query.count(),
+    'busiest_venue_id': busiest_venue,
+    'busiest_artist_id': busiest_artist,
+  }
+  results = bench.run(db.engine, benchmarks, repeat, before_each=db.session.remove, context=context)
+  # a worker's cold start: importing the app, creating it and its first page
+  results['results'].update(bench.startup(current_app.root_path, startup_path, repeat))
+
+  if output is None:
+    os.makedirs('benchmarks', exist_ok=True)
+    output = os.path.join('benchmarks', '{}.json'.format(results['commit'] or 'results'))
+  bench.save(results, output)
+  if baseline:
+    lines = bench.compare(bench.load(baseline), results)
+  else:
+    lines = ['{:<28} {:>10.3f} ms {:>5} queries{}'.format(
+               name, r['median_ms'], r['queries'],
+               ' {:>9.3f} us/item'.format(r['per_item_us']) if 'per_item_us' in r else '')
+             for name, r in sorted(results['results'].items())]
+  click.echo('\n'.join(lines))
+  click.echo('results written to {}'.format(output))
+
+COMMANDS = (
+  explain_command,
+  counters_group,
+  assets_command,
+  conflicts_command,
+  seed_command,
+  import_command,
+  bench_command,
+)
+
+def register_commands(app):
+  for command in COMMANDS:
+    app.cli.add_command(command)
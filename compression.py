@@ -0,0 +1,142 @@
+#----------------------------------------------------------------------------#
+# Response compression.
+#
+# Compress wraps the WSGI app and encodes text responses with brotli (when
+# the brotli package is installed) or gzip, whichever the client prefers.
+# Bodies are compressed as they are produced: every chunk the app yields is
+# flushed through the encoder straight away, so streamed pages still reach
+# the client a piece at a time. Responses that are already encoded (the
+# precompressed bundles under static/dist/) or too small to gain anything
+# pass through untouched. compress_response() does the same for a complete
+# response outside the WSGI stack.
+#----------------------------------------------------------------------------#
+
+import zlib
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+
+COMPRESSIBLE = (
+  'text/', 'application/json', 'application/javascript',
+  'application/x-ndjson', 'image/svg+xml',
+)
+
+
+class GzipEncoder(object):
+
+  def __init__(self, level):
+    # wbits 31: a gzip header and trailer around the deflate stream
+    self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+  def encode(self, chunk):
+    return self.compressor.compress(chunk) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+  def finish(self):
+    return self.compressor.flush()
+
+
+class BrotliEncoder(object):
+
+  def __init__(self, level):
+    import brotli
+    # brotli's quality runs 0-11 against zlib's 1-9
+    self.compressor = brotli.Compressor(quality=min(11, level + 1))
+
+  def encode(self, chunk):
+    return self.compressor.process(chunk) + self.compressor.flush()
+
+  def finish(self):
+    return self.compressor.finish()
+
+
+def available_encoders():
+  encoders = {'gzip': GzipEncoder}
+  try:
+    import brotli  # noqa: F401
+  except ImportError:
+    return encoders
+  encoders['br'] = BrotliEncoder
+  return encoders
+
+
+class Compress(object):
+
+  def __init__(self, app, minimum_size=500, level=6):
+    self.app = app
+    self.minimum_size = minimum_size
+    self.level = level
+    self.encoders = available_encoders()
+
+  def choose(self, accept_encoding):
+    # the accepted encoding with the highest quality, brotli on a tie
+    accepted = parse_accept_header(accept_encoding or '')
+    best = max(((accepted[name], name == 'br', name) for name in self.encoders), default=None)
+    return best[2] if best and best[0] > 0 else None
+
+  def compressible(self, status, headers):
+    if not status.startswith('200') or 'Content-Encoding' in headers:
+      return False
+    if not headers.get('Content-Type', '').startswith(COMPRESSIBLE):
+      return False
+    length = headers.get('Content-Length')
+    return length is None or int(length) >= self.minimum_size
+
+  def mark(self, headers, encoding):
+    headers.remove('Content-Length')
+    headers['Content-Encoding'] = encoding
+    headers.add('Vary', 'Accept-Encoding')
+    self.weaken_etag(headers)
+
+  def weaken_etag(self, headers):
+    # the encoded body is another representation of the same page, and a
+    # 304 answers for whichever one the client holds
+    etag = headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+      headers['ETag'] = 'W/' + etag
+
+  def __call__(self, environ, start_response):
+    encoding = self.choose(environ.get('HTTP_ACCEPT_ENCODING'))
+    if encoding is None or environ['REQUEST_METHOD'] == 'HEAD':
+      return self.app(environ, start_response)
+
+    encoders = []
+
+    def start(status, headers, exc_info=None):
+      headers = Headers(headers)
+      if self.compressible(status, headers):
+        encoders.append(self.encoders[encoding](self.level))
+        self.mark(headers, encoding)
+      elif status.startswith('304'):
+        self.weaken_etag(headers)
+      return start_response(status, headers.to_wsgi_list(), exc_info)
+
+    return self.encode(self.app(environ, start), encoders)
+
+  def encode(self, body, encoders):
+    # start_response has been called by the time the first chunk is out
+    try:
+      for chunk in body:
+        if not encoders:
+          yield chunk
+        elif chunk:
+          yield encoders[0].encode(chunk)
+      if encoders:
+        yield encoders[0].finish()
+    finally:
+      if hasattr(body, 'close'):
+        body.close()
+
+  def compress_response(self, response, accept_encoding):
+    # the same for a finished, unstreamed Response outside the WSGI stack
+    # (the async views of asgi.py)
+    encoding = self.choose(accept_encoding)
+    if encoding is None:
+      return response
+    if self.compressible(response.status, response.headers):
+      encoder = self.encoders[encoding](self.level)
+      data = encoder.encode(response.get_data()) + encoder.finish()
+      self.mark(response.headers, encoding)
+      response.set_data(data)
+    elif response.status_code == 304:
+      self.weaken_etag(response.headers)
+    return response
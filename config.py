@@ -10,4 +10,87 @@ DEBUG = True
 
 
 # TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgres://xiaofan@localhost:5432/fyyurapp'
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgres://xiaofan@localhost:5432/fyyurapp')
+DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 10))
+DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW', 20))
+
+# Read replica for the read-only views; unset, everything reads the primary
+DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+SQLALCHEMY_BINDS = {'replica': DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
+REPLICA_POOL_SIZE = int(os.environ.get('REPLICA_POOL_SIZE', 10))
+REPLICA_MAX_OVERFLOW = int(os.environ.get('REPLICA_MAX_OVERFLOW', 20))
+# seconds a client reads from the primary after writing, to cover replica lag
+REPLICA_STICKY_SECONDS = 5
+
+# Async serving mode (asgi.py): the same databases through an async driver,
+# asyncpg for Postgres or aiosqlite for SQLite. Unset, the URLs above are
+# used with their scheme adjusted.
+ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL')
+ASYNC_REPLICA_URL = os.environ.get('ASYNC_REPLICA_URL')
+
+# Search
+SEARCH_PAGE_SIZE = 20
+# seconds before the in-process search index (non-Postgres only) is rebuilt
+SEARCH_INDEX_TTL = 60
+
+# Shows listing
+SHOWS_PAGE_SIZE = 30
+# Most shows accepted by one POST /shows/batch
+SHOWS_BATCH_MAX = 1000
+# Most venues or artists deleted by one DELETE /venues or /artists
+DELETE_BATCH_MAX = 1000
+# Show calendar: shows per page, and the longest date range it accepts
+CALENDAR_PAGE_SIZE = 100
+CALENDAR_MAX_DAYS = 31
+
+# Page data cache: 'lru' keeps entries in each worker's memory, 'redis'
+# shares them through CACHE_REDIS_URL
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'lru')
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+CACHE_MAXSIZE = 1024
+# seconds; also bounds how long a show stays listed as upcoming after it starts
+CACHE_TTL = 60
+
+# seconds between rolls of started shows from the upcoming into the past
+# show counters, done by the next show write (or `flask counters roll`)
+COUNTERS_ROLL_INTERVAL = 300
+
+# Where compiled templates are cached; unset, a per-user directory under
+# the system temp directory
+JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+
+# Listings streamed to the client: template events per chunk sent, and
+# rows per database round trip while they are read
+STREAM_BUFFER_SIZE = 64
+STREAM_BATCH_SIZE = 500
+
+# Response compression (brotli when installed, else gzip): bodies smaller
+# than COMPRESS_MIN_SIZE bytes are sent as they are
+COMPRESS_MIN_SIZE = 500
+COMPRESS_LEVEL = 6
+
+# Instrumentation: how many of a request's slowest statements to log
+METRICS_SLOWEST_STATEMENTS = 3
+
+# Logging, when DEBUG is off: JSON lines written to LOG_FILE by a
+# background thread. Records beyond LOG_QUEUE_SIZE waiting to be written
+# are dropped.
+LOG_FILE = os.environ.get('LOG_FILE', 'error.log')
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_QUEUE_SIZE = 10000
+# The file is rotated at LOG_MAX_BYTES (0: never), or on a schedule when
+# LOG_ROTATE_WHEN is set ('midnight', 'H', ...), keeping LOG_BACKUP_COUNT
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_ROTATE_WHEN = os.environ.get('LOG_ROTATE_WHEN')
+LOG_BACKUP_COUNT = 5
+# Share of successful (status < 400) request lines written; errors always are
+LOG_SUCCESS_SAMPLE_RATE = float(os.environ.get('LOG_SUCCESS_SAMPLE_RATE', 1.0))
+
+# Slow-query log: statements taking longer than SLOW_QUERY_MS are logged
+# (0: off). On Postgres one SELECT per SLOW_QUERY_EXPLAIN_INTERVAL seconds
+# is run again under EXPLAIN (ANALYZE, BUFFERS) for its plan (0: never).
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 0))
+SLOW_QUERY_EXPLAIN_INTERVAL = 60
+
+# Rows fetched per round trip by the streaming /export endpoints
+EXPORT_BATCH_SIZE = 1000
@@ -0,0 +1,170 @@
+#----------------------------------------------------------------------------#
+# Denormalized upcoming and past show counts on venues and artists.
+#
+# Every Venue and Artist row carries upcoming_shows_count and
+# past_shows_count. A show is counted as upcoming while its start_time is
+# at or after the watermark kept in the ShowCounterWatermark table, and the
+# write paths adjust the counts of its venue and artist as shows are added
+# or removed. Rolling moves the shows that have started since the
+# watermark from upcoming to past and advances it; until then, reads
+# subtract those few shows (an index range on Show.start_time), so the
+# counts they see are exact without writing anything.
+#----------------------------------------------------------------------------#
+
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import and_, bindparam, case, func, select
+
+MEMBERS = (('venue_id', 'Venue'), ('artist_id', 'Artist'))
+
+
+class ShowCounters(object):
+
+  def __init__(self, tables, roll_interval=300):
+    # tables maps 'Show', 'Venue', 'Artist' and 'ShowCounterWatermark' to
+    # their Table objects; it is read on use, so MetaData.tables can be
+    # passed before the models are declared. Writes that find the watermark
+    # more than roll_interval seconds old roll it forward on their way.
+    self.tables = tables
+    self.roll_interval = roll_interval
+
+  def init_app(self, app):
+    self.roll_interval = app.config.get('COUNTERS_ROLL_INTERVAL', self.roll_interval)
+
+  @property
+  def show(self):
+    return self.tables['Show']
+
+  @property
+  def members(self):
+    return [(key, self.tables[name]) for key, name in MEMBERS]
+
+  @property
+  def watermark_table(self):
+    return self.tables['ShowCounterWatermark']
+
+  def watermark(self, conn, lock=False):
+    # the current watermark. lock holds it (FOR UPDATE on Postgres) until
+    # the transaction ends, so counts and watermark move together.
+    query = select([self.watermark_table.c.rolled_until]).where(self.watermark_table.c.id == 1)
+    if lock:
+      query = query.with_for_update()
+    rolled_until = conn.execute(query).scalar()
+    if rolled_until is None:
+      # no row yet: a database created without migrations, still empty
+      rolled_until = datetime.now()
+      conn.execute(self.watermark_table.insert(), id=1, rolled_until=rolled_until)
+    return rolled_until
+
+  def moved(self, key, now):
+    # (member_id, moved) for the shows of each venue or artist that have
+    # started since the watermark: still counted as upcoming, already past
+    column = self.show.c[key]
+    rolled_until = select([self.watermark_table.c.rolled_until]).where(
+      self.watermark_table.c.id == 1).as_scalar()
+    return select([column.label('member_id'), func.count().label('moved')]).where(and_(
+      self.show.c.start_time >= rolled_until, self.show.c.start_time < now,
+    )).group_by(column).alias('moved_' + key)
+
+  def record(self, conn, shows, sign=1):
+    # counts shows (dicts or rows with venue_id, artist_id and start_time)
+    # in, or out with sign=-1, inside the caller's transaction
+    rolled_until = self.watermark(conn, lock=True)
+    now = datetime.now()
+    if (now - rolled_until).total_seconds() > self.roll_interval:
+      self.roll(conn, now)
+      rolled_until = now
+    for key, table in self.members:
+      deltas = defaultdict(lambda: [0, 0])
+      for show in shows:
+        if show['start_time'] >= rolled_until:
+          deltas[show[key]][0] += sign
+        else:
+          deltas[show[key]][1] += sign
+      self._apply(conn, table, [(id, up, past) for id, (up, past) in deltas.items()])
+
+  def forget(self, conn, key, ids):
+    # counts out every show of the venues (key='venue_id') or artists
+    # with ids, which are about to be deleted with them, from the other
+    # side's counts. The shows are tallied in SQL, never loaded.
+    rolled_until = self.watermark(conn, lock=True)
+    for other, table in self.members:
+      if other == key:
+        continue
+      column = self.show.c[other]
+      rows = conn.execute(select([
+        column,
+        func.sum(case([(self.show.c.start_time >= rolled_until, 1)], else_=0)),
+        func.sum(case([(self.show.c.start_time < rolled_until, 1)], else_=0)),
+      ]).where(self.show.c[key].in_(ids)).group_by(column)).fetchall()
+      self._apply(conn, table, [(id, -up, -past) for id, up, past in rows])
+
+  def roll(self, conn, now=None):
+    # moves the shows that started since the watermark from upcoming to past
+    # and returns how many there were
+    now = now or datetime.now()
+    rolled_until = self.watermark(conn, lock=True)
+    if now <= rolled_until:
+      return 0
+    moved = 0
+    for key, table in self.members:
+      column = self.show.c[key]
+      rows = conn.execute(select([column, func.count()]).where(and_(
+        self.show.c.start_time >= rolled_until, self.show.c.start_time < now,
+      )).group_by(column)).fetchall()
+      self._apply(conn, table, [(id, -count, count) for id, count in rows])
+      # the same shows are counted for venues and for artists
+      moved = sum(count for _, count in rows)
+    conn.execute(self.watermark_table.update().where(
+      self.watermark_table.c.id == 1).values(rolled_until=now))
+    return moved
+
+  def _apply(self, conn, table, deltas):
+    deltas = [d for d in deltas if d[1] or d[2]]
+    if not deltas:
+      return
+    conn.execute(table.update().where(table.c.id == bindparam('member_id')).values(
+      upcoming_shows_count=table.c.upcoming_shows_count + bindparam('upcoming'),
+      past_shows_count=table.c.past_shows_count + bindparam('past'),
+    ), [{'member_id': id, 'upcoming': up, 'past': past} for id, up, past in deltas])
+
+  def actual(self, key, table, rolled_until):
+    # correlated subqueries counting a member's shows on each side of the
+    # watermark, as the stored counts should
+    column = self.show.c[key]
+    upcoming = select([func.count()]).where(and_(
+      column == table.c.id, self.show.c.start_time >= rolled_until)).as_scalar()
+    past = select([func.count()]).where(and_(
+      column == table.c.id, self.show.c.start_time < rolled_until)).as_scalar()
+    return upcoming, past
+
+  def verify(self, conn):
+    # [(table name, id, stored (upcoming, past), actual (upcoming, past))]
+    # for every venue and artist whose counts have drifted
+    rolled_until = self.watermark(conn)
+    drift = []
+    for key, table in self.members:
+      upcoming, past = self.actual(key, table, rolled_until)
+      query = select([
+        table.c.id, table.c.upcoming_shows_count, table.c.past_shows_count,
+        upcoming.label('upcoming'), past.label('past'),
+      ]).order_by(table.c.id)
+      for id, stored_up, stored_past, up, past_count in conn.execute(query):
+        if (stored_up, stored_past) != (up, past_count):
+          drift.append((table.name, id, (stored_up, stored_past), (up, past_count)))
+    return drift
+
+  def repair(self, conn, ids=None):
+    # recomputes the counts from the Show table, for every row or only the
+    # (table name, id) pairs given
+    rolled_until = self.watermark(conn, lock=True)
+    for key, table in self.members:
+      upcoming, past = self.actual(key, table, rolled_until)
+      update = table.update().values(upcoming_shows_count=upcoming, past_shows_count=past)
+      if ids is not None:
+        member_ids = [id for name, id in ids if name == table.name]
+        if not member_ids:
+          continue
+        update = update.where(table.c.id.in_(member_ids))
+      conn.execute(update)
@@ -0,0 +1,104 @@
+#----------------------------------------------------------------------------#
+# Query-plan regression check.
+#
+# Requests every read route through the test client, records the SELECTs it
+# issues against a table, runs EXPLAIN on each and reports any plan that
+# reads the whole table: a sequential scan, or a walk over all of one of
+# its indexes. Run it with `flask explain`; tests/test_query_plans.py runs
+# it on SQLite.
+#----------------------------------------------------------------------------#
+
+import re
+
+from sqlalchemy import event
+
+
+def route_requests(app, ids):
+  # (method, url, form data) for every parameterless GET route, every GET
+  # route whose arguments are all in ids, and the POST search routes
+  requests = []
+  for rule in app.url_map.iter_rules():
+    if rule.endpoint == 'static':
+      continue
+    if 'GET' in rule.methods and set(rule.arguments) <= set(ids):
+      requests.append(('GET', rule.build(
+        dict((arg, ids[arg]) for arg in rule.arguments))[1], None))
+    elif 'POST' in rule.methods and rule.endpoint.rsplit('.', 1)[-1].startswith('search_'):
+      requests.append(('POST', rule.rule, {'search_term': 'a'}))
+  return sorted(requests)
+
+
+def capture_statements(app, engine, requests, table):
+  statements = []
+  pattern = re.compile(r'\bFROM\b.*"?\b{}\b"?'.format(table), re.S | re.I)
+
+  def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith('SELECT') and pattern.search(statement):
+      statements.append((current[0], statement, parameters))
+
+  current = [None]
+  event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+  try:
+    client = app.test_client()
+    for method, url, data in requests:
+      current[0] = '{} {}'.format(method, url)
+      client.open(url, method=method, data=data)
+  finally:
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+  return statements
+
+
+def explain(conn, statement, parameters):
+  # returns the plan as text lines
+  if conn.dialect.name == 'postgresql':
+    rows = conn.execute('EXPLAIN ' + statement, parameters)
+    return [row[0] for row in rows]
+  rows = conn.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+  return [row[-1] for row in rows]
+
+
+def full_scans(plan, table):
+  # the lines of plan that read all of table. Postgres: a Seq Scan, or an
+  # Index (Only) Scan with no Index Cond under it, such as a count(*) over
+  # an index; a Bitmap Heap Scan is bounded by its Bitmap Index Scan.
+  # SQLite: any SCAN of it, through an index or not (older versions print
+  # 'SCAN TABLE'); a bounded read is a SEARCH. Aliases such as "Show_1"
+  # count as the table.
+  name = r'"?{}(_\d+)?"?(?!\w)'.format(table)
+  found = []
+  for i, line in enumerate(plan):
+    node = line.strip()
+    if node.startswith('->'):
+      node = node[2:].strip()
+    if re.match(r'SCAN (TABLE )?' + name, node) or re.match(r'Seq Scan on ' + name, node):
+      found.append(line)
+    elif re.match(r'Index (Only )?Scan (Backward )?using \S+ on ' + name, node):
+      details = []
+      for detail in plan[i + 1:]:
+        if detail.strip().startswith('->'):
+          break
+        details.append(detail.strip())
+      if not any(d.startswith('Index Cond:') for d in details):
+        found.append(line)
+  return found
+
+
+def check_query_plans(app, engine, ids, table='Show'):
+  # returns [(route, statement, plan lines)] for plans that read all of table
+  statements = capture_statements(app, engine, route_requests(app, ids), table)
+  failures = []
+  with engine.connect() as conn:
+    # on a small table Postgres prefers a sequential scan anyway; with them
+    # disabled one only shows up when no usable index exists, and a query
+    # with nothing to bound its index scan by shows up as a full index scan
+    if conn.dialect.name == 'postgresql':
+      conn.execute('SET enable_seqscan = off')
+    try:
+      for route, statement, parameters in statements:
+        plan = explain(conn, statement, parameters)
+        if full_scans(plan, table):
+          failures.append((route, statement, plan))
+    finally:
+      if conn.dialect.name == 'postgresql':
+        conn.execute('RESET enable_seqscan')
+  return failures
@@ -0,0 +1,63 @@
+#----------------------------------------------------------------------------#
+# Streaming NDJSON and CSV serialization for the /export endpoints.
+#
+# The serializers consume row iterators lazily and yield one encoded line
+# at a time, so with a server-side cursor underneath (Query.yield_per) a
+# full dump never holds more than one batch of rows in memory. The field
+# names match what `flask import` reads back.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import groupby
+
+MIMETYPES = {
+  'ndjson': 'application/x-ndjson',
+  'csv': 'text/csv',
+}
+
+
+def encode(value):
+  if isinstance(value, datetime):
+    return value.isoformat()
+  return value
+
+
+def ndjson_lines(records, fields):
+  for record in records:
+    yield json.dumps(dict((f, encode(record[f])) for f in fields)) + '\n'
+
+
+def csv_lines(records, fields):
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  writer.writerow(fields)
+  for record in records:
+    writer.writerow([
+      ','.join(record[f]) if isinstance(record[f], list) else encode(record[f])
+      for f in fields])
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+  # the header alone when there are no records
+  if buffer.getvalue():
+    yield buffer.getvalue()
+
+
+def with_genres(rows, fields):
+  # folds consecutive rows of the same entity (ordered by id and outer
+  # joined to its genres, with the genre name last) into one record with a
+  # list of genre names
+  for id, group in groupby(rows, key=lambda row: row[0]):
+    group = list(group)
+    record = dict(zip(fields, group[0]))
+    record['genres'] = [row[-1] for row in group if row[-1] is not None]
+    yield record
+
+
+def serialize(format, records, fields):
+  if format == 'csv':
+    return csv_lines(records, fields)
+  return ndjson_lines(records, fields)
@@ -0,0 +1,30 @@
+#----------------------------------------------------------------------------#
+# Extension objects.
+#
+# Created here without an app and bound to one by create_app() with
+# init_app(), so the models, the blueprints and asgi.py can import them
+# before any app exists.
+#----------------------------------------------------------------------------#
+
+from assets import Assets
+from cache import DataCache
+from counters import ShowCounters
+from instrumentation import RequestMetrics
+from requestlog import RequestLog
+from routing import RoutingSQLAlchemy
+from search import SearchEngine
+from slowqueries import SlowQueryLog
+
+db = RoutingSQLAlchemy()
+show_counters = ShowCounters(db.metadata.tables)
+search_engine = SearchEngine(db, show_counters)
+page_cache = DataCache(pinned=db.pinned, lagging=db.lagging)
+metrics = RequestMetrics(engines=db.engines)
+metrics.gauge('fyyur_cache_hits_total', 'Page data cache hits.', lambda: page_cache.hits, 'counter')
+metrics.gauge('fyyur_cache_misses_total', 'Page data cache misses.', lambda: page_cache.misses, 'counter')
+slow_queries = SlowQueryLog()
+metrics.gauge('fyyur_slow_queries_total', 'Statements over SLOW_QUERY_MS.', lambda: slow_queries.logged, 'counter')
+request_log = RequestLog()
+metrics.gauge('fyyur_log_records_dropped_total', 'Log records dropped on a full queue.', lambda: request_log.dropped, 'counter')
+# fingerprinted CSS/JS bundles from `flask assets`, served from static/dist/
+assets = Assets()
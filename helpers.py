@@ -0,0 +1,274 @@
+#----------------------------------------------------------------------------#
+# Helpers shared by the venue, artist and show blueprints: the datetime
+# filter, show splitting, deletes, cursors, and the conditional GET
+# machinery.
+#----------------------------------------------------------------------------#
+
+import hashlib
+import traceback
+from datetime import date, datetime
+from functools import lru_cache, wraps
+
+from flask import Response, abort, current_app, g, jsonify, make_response, request, session, stream_with_context
+from sqlalchemy import case, func, null
+
+from extensions import db, page_cache, search_engine, show_counters
+from models import Artist, DeletionCounter, Genre, Show, Venue
+
+#----------------------------------------------------------------------------#
+# Filters.
+#----------------------------------------------------------------------------#
+
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+  'date': "EEEE MMMM, d, y",
+}
+
+# the filter runs once per show tile, so the locale and the parsed patterns
+# are built once rather than on every call. babel is imported with the
+# first pattern, so a worker that renders no dates never loads it.
+@lru_cache(maxsize=None)
+def datetime_formatter(format):
+  import babel.dates
+  locale = babel.Locale.parse(babel.dates.LC_TIME)
+  pattern = babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format))
+  return lambda value: pattern.apply(value, locale)
+
+def format_datetime(value, format='medium'):
+  # value is a datetime or date; strings are still parsed, the slow way
+  if not isinstance(value, date):
+    import dateutil.parser
+    value = dateutil.parser.parse(value)
+  return datetime_formatter(format)(value)
+
+#----------------------------------------------------------------------------#
+# Helpers.
+#----------------------------------------------------------------------------#
+
+def split_shows(shows, counterpart):
+  # splits already-loaded shows into past and upcoming in a single pass.
+  # counterpart(show) returns the artist or venue fields shown on each tile.
+  now = datetime.now()
+  past_shows = []
+  upcoming_shows = []
+  for s in sorted(shows, key=lambda s: s.start_time):
+    show_dict = counterpart(s)
+    show_dict['start_time'] = s.start_time
+    if s.start_time < now:
+      past_shows.append(show_dict)
+    else:
+      upcoming_shows.append(show_dict)
+  return {
+    'past_shows': past_shows,
+    'upcoming_shows': upcoming_shows,
+    'past_shows_count': len(past_shows),
+    'upcoming_shows_count': len(upcoming_shows),
+  }
+
+def genre_members(association, genre):
+  # ids of the venues or artists tagged with genre, read through the
+  # (genre_id, member id) index of the association table
+  member = [c for c in association.c if c.name != 'genre_id'][0]
+  return db.session.query(member).join(
+    Genre, Genre.id == association.c.genre_id).filter(Genre.name == genre)
+
+def venue_cache_keys(*venue_ids):
+  # a venue's name and image also appear on the pages of its artists; the
+  # listings live in the 'venues' namespace and are invalidated separately
+  keys = ['venue:{}'.format(v) for v in venue_ids]
+  keys += ['artist:{}'.format(a) for a, in db.session.query(
+    Show.artist_id).filter(Show.venue_id.in_(venue_ids)).distinct()]
+  return keys
+
+def artist_cache_keys(*artist_ids):
+  # an artist's name and image also appear on the pages of its venues; the
+  # listings live in the 'artists' namespace and are invalidated separately
+  keys = ['artist:{}'.format(a) for a in artist_ids]
+  keys += ['venue:{}'.format(v) for v, in db.session.query(
+    Show.venue_id).filter(Show.artist_id.in_(artist_ids)).distinct()]
+  return keys
+
+# the page cache namespaces listing what a deleted venue or artist was on
+DELETED_NAMESPACES = {
+  Venue: ('venues', 'shows'),
+  Artist: ('artists', 'venues', 'shows'),
+}
+
+def delete_members(model, ids):
+  # deletes the venues or artists with ids in one statement, in the
+  # session's transaction. Their shows and genre tags go with them through
+  # ON DELETE CASCADE, after the shows have been counted out of the other
+  # side's counters in SQL, so no Show is loaded. Returns the number of
+  # rows deleted and the page cache keys to invalidate once committed.
+  key, cache_keys = ('venue_id', venue_cache_keys) if model is Venue else ('artist_id', artist_cache_keys)
+  keys = cache_keys(*ids)
+  show_counters.forget(db.session.connection(), key, ids)
+  deleted = db.session.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+  if deleted:
+    DeletionCounter.record(db.session.connection(), model.__tablename__, Show.__tablename__)
+  return deleted, keys
+
+def delete_ids(payload):
+  # the ids of a bulk delete's {"ids": [...]} body, None if malformed
+  ids = payload.get('ids') if isinstance(payload, dict) else None
+  if not isinstance(ids, list) or not all(type(i) is int for i in ids):
+    return None
+  return sorted(set(ids))
+
+def forget_deleted(model, keys):
+  # once a delete_members() transaction has committed: drops the search
+  # results, the pages keys names and the listings the members were on
+  search_engine.invalidate(model)
+  page_cache.invalidate(*keys)
+  for namespace in DELETED_NAMESPACES[model]:
+    page_cache.invalidate_namespace(namespace)
+
+def bulk_delete(model):
+  # DELETE /venues and /artists: deletes the members of {"ids": [...]},
+  # with their shows, in one statement; ids that do not exist are ignored
+  plural = model.__tablename__.lower() + 's'
+  ids = delete_ids(request.get_json(silent=True))
+  if ids is None:
+    return jsonify({'success': False, 'error': 'expected {"ids": [...]} of integers'}), 400
+  if len(ids) > current_app.config['DELETE_BATCH_MAX']:
+    return jsonify({'success': False, 'error': 'at most {} ids per request'.format(current_app.config['DELETE_BATCH_MAX'])}), 413
+  try:
+    deleted, keys = delete_members(model, ids) if ids else (0, [])
+    db.session.commit()
+  except:
+    db.session.rollback()
+    traceback.print_exc()
+    return jsonify({'success': False, 'error': 'the {} could not be deleted'.format(plural)}), 500
+  finally:
+    db.session.close()
+  if deleted:
+    forget_deleted(model, keys)
+  return jsonify({'success': True, 'deleted': deleted})
+
+def encode_cursor(start_time, id):
+  return '{}_{}'.format(start_time.isoformat(), id)
+
+def decode_cursor(cursor):
+  # (start_time, id) from an encode_cursor() string, None when absent
+  if not cursor:
+    return None
+  try:
+    start_time, id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(start_time), int(id)
+  except ValueError:
+    abort(400)
+
+def parse_date_arg(name):
+  value = request.args.get(name)
+  if not value:
+    return None
+  try:
+    return datetime.fromisoformat(value)
+  except ValueError:
+    abort(400)
+
+def page_validators(values, last_started=None):
+  # (etag, last_modified) for a page. values are the max(updated_at) of the
+  # rows it shows and counts of them or of their deletions, with the time
+  # of the latest deletion; a show starting moves it from upcoming to past,
+  # so last_started, the latest start time that has passed (local time,
+  # like every start_time), is a change too. Every datetime counts towards
+  # Last-Modified. HTTP dates are whole seconds, so while the latest change
+  # is in the current second another could follow unseen by a client's
+  # If-Modified-Since: the page then goes out with its ETag alone.
+  values = tuple(values)
+  if last_started is not None:
+    values += (datetime.utcfromtimestamp(last_started.timestamp()),)
+  times = [v for v in values if isinstance(v, datetime)]
+  etag = hashlib.sha1(repr(values).encode()).hexdigest()
+  last_modified = max(times) if times else None
+  if last_modified is not None and last_modified >= datetime.utcnow().replace(microsecond=0):
+    last_modified = None
+  return etag, last_modified
+
+def set_validators(response, etag, last_modified):
+  response.set_etag(etag)
+  response.last_modified = last_modified
+  # clients may keep the page but must check it is current before use
+  response.cache_control.no_cache = True
+  return response
+
+def stream_template(template_name, **context):
+  # renders into the response body as it is sent, a few template events per
+  # chunk, so the client gets the top of a long page before the bottom is
+  # rendered and the page is never held whole in memory
+  current_app.update_template_context(context)
+  stream = current_app.jinja_env.get_template(template_name).stream(context)
+  stream.enable_buffering(current_app.config['STREAM_BUFFER_SIZE'])
+  return Response(stream_with_context(stream), mimetype='text/html')
+
+def conditional(validator):
+  # answers 304 Not Modified when the client's copy is current, before the
+  # view loads or renders anything. validator takes the view's arguments
+  # and returns the query for validators_from_row(); no row means the page
+  # does not exist. The ETag is left in g.etag for the view to pass to
+  # page_cache as the version of the data it caches.
+  def decorator(view):
+    @wraps(view)
+    def wrapper(**kwargs):
+      # a pending flash message is shown on the page but is not part of
+      # the validators, so such a response gets none and is never a 304
+      if '_flashes' in session:
+        return view(**kwargs)
+      validators = validators_from_row(validator(**kwargs).first())
+      if validators is None:
+        abort(404)
+      response = not_modified(*validators)
+      if response is not None:
+        return response
+      g.etag = validators[0]
+      return set_validators(make_response(view(**kwargs)), *validators)
+    return wrapper
+  return decorator
+
+def not_modified(etag, last_modified):
+  # the 304 response for the current request, or None if it needs the page
+  response = set_validators(Response(), etag, last_modified).make_conditional(request)
+  return response if response.status_code == 304 else None
+
+#----------------------------------------------------------------------------#
+# Validators.
+#
+# One aggregate query per page gives the ETag and Last-Modified that let
+# conditional() answer 304 without building the page. Each blueprint's
+# validator functions return the query; its single row ends with the latest
+# start time already passed (see page_validators).
+#----------------------------------------------------------------------------#
+
+def last_started():
+  return func.max(case([(Show.start_time < datetime.now(), Show.start_time)]))
+
+def validators_from_row(row):
+  if row is None:
+    return None
+  return page_validators(row[:-1], row[-1])
+
+def deletion_time(model):
+  # the time of the latest deletion from model's table, kept by
+  # delete_members(), as a scalar subquery read by primary key
+  return db.session.query(DeletionCounter.deleted_at).filter(
+    DeletionCounter.table_name == model.__tablename__).as_scalar()
+
+def table_validators(*models, shows_start=False):
+  # whole-table validators as scalar subqueries of one query, each read off
+  # the end of an index or a primary key: max(updated_at), the deletion
+  # count and time in place of count(*), and the latest start time that
+  # has passed
+  columns = []
+  for model in models:
+    columns.append(db.session.query(func.max(model.updated_at)).as_scalar())
+    columns.append(db.session.query(DeletionCounter.deleted).filter(
+      DeletionCounter.table_name == model.__tablename__).as_scalar())
+    columns.append(deletion_time(model))
+  if shows_start:
+    columns.append(db.session.query(func.max(Show.start_time)).filter(
+      Show.start_time < datetime.now()).as_scalar())
+  else:
+    columns.append(null())
+  return db.session.query(*columns)
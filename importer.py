@@ -0,0 +1,320 @@
+#----------------------------------------------------------------------------#
+# Bulk import of venues, artists and shows from CSV or NDJSON files.
+#
+# Records are streamed from the file and loaded a chunk at a time, one
+# transaction per chunk: COPY on Postgres, executemany elsewhere. Show
+# references (venue_id/venue_name, artist_id/artist_name) and genre names
+# are resolved with one IN query per chunk. Records that fail validation,
+# or that the database refuses, are written to a rejects file with their
+# line number and reason instead of aborting the load. Shows that overlap
+# a booked show of their venue or artist, or an earlier show of the file,
+# are rejected the same way. Imported shows are added to the venue and
+# artist show counters in the same transaction.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+from datetime import datetime
+
+import dateutil.parser
+from sqlalchemy import func, select, text
+
+from counters import ShowCounters
+from schedule import MAX_DURATION, batch_conflicts, overlap_reason
+
+REQUIRED = {
+  'venues': ('name', 'city', 'state', 'address', 'phone'),
+  'artists': ('name', 'city', 'state', 'phone'),
+  'shows': ('start_time',),
+}
+
+COLUMNS = {
+  'venues': ('name', 'city', 'state', 'address', 'phone', 'image_link',
+             'facebook_link', 'website_link', 'seeking_talent', 'seeking_description'),
+  'artists': ('name', 'city', 'state', 'phone', 'image_link', 'facebook_link',
+              'website_link', 'seeking_venue', 'seeking_description'),
+  'shows': ('venue_id', 'artist_id', 'start_time', 'duration'),
+}
+
+TABLES = {'venues': 'Venue', 'artists': 'Artist', 'shows': 'Show'}
+
+
+class Reject(Exception):
+  pass
+
+
+def read_records(path, format=None):
+  # yields (line number, record dict) from a CSV or NDJSON file
+  format = format or ('ndjson' if path.endswith(('.ndjson', '.jsonl', '.json')) else 'csv')
+  with open(path, newline='') as f:
+    if format == 'csv':
+      reader = csv.DictReader(f)
+      for record in reader:
+        yield reader.line_num, record
+    else:
+      for line_no, line in enumerate(f, 1):
+        if line.strip():
+          try:
+            yield line_no, json.loads(line)
+          except ValueError as e:
+            yield line_no, Reject('invalid JSON: {}'.format(e))
+
+
+def chunked(records, size):
+  chunk = []
+  for record in records:
+    chunk.append(record)
+    if len(chunk) == size:
+      yield chunk
+      chunk = []
+  if chunk:
+    yield chunk
+
+
+def parse_bool(value):
+  if isinstance(value, bool) or value is None:
+    return value
+  value = str(value).strip().lower()
+  if value in ('', 'none', 'null'):
+    return None
+  if value in ('1', 'true', 't', 'yes', 'y'):
+    return True
+  if value in ('0', 'false', 'f', 'no', 'n'):
+    return False
+  raise Reject('not a boolean: {!r}'.format(value))
+
+
+def parse_datetime(value):
+  if isinstance(value, datetime):
+    return value
+  try:
+    return datetime.fromisoformat(value)
+  except (TypeError, ValueError):
+    pass
+  try:
+    return dateutil.parser.parse(value)
+  except (TypeError, ValueError, OverflowError):
+    raise Reject('not a date/time: {!r}'.format(value))
+
+
+def parse_genres(value):
+  if not value:
+    return []
+  if isinstance(value, str):
+    value = value.split(',')
+  return sorted(set(str(v).strip() for v in value if str(v).strip()))
+
+
+def parse_id(value, field):
+  try:
+    return int(value)
+  except (TypeError, ValueError):
+    raise Reject('{} is not an integer: {!r}'.format(field, value))
+
+
+def clean(kind, record):
+  # validates one record and returns the row to insert, plus its genres
+  missing = [f for f in REQUIRED[kind] if record.get(f) in (None, '')]
+  if kind == 'shows':
+    for ref in ('venue', 'artist'):
+      if record.get(ref + '_id') in (None, '') and record.get(ref + '_name') in (None, ''):
+        missing.append(ref + '_id or ' + ref + '_name')
+  if missing:
+    raise Reject('missing ' + ', '.join(missing))
+
+  row = {}
+  for column in COLUMNS[kind]:
+    value = record.get(column)
+    if value == '':
+      value = None
+    if column.startswith('seeking_') and column != 'seeking_description':
+      value = parse_bool(value)
+    elif column == 'start_time':
+      value = parse_datetime(value)
+    elif column in ('venue_id', 'artist_id') and value is not None:
+      value = parse_id(value, column)
+    elif column == 'duration' and value is not None:
+      value = parse_id(value, column)
+      if not 0 < value <= MAX_DURATION:
+        raise Reject('duration is not between 1 and {} minutes: {}'.format(MAX_DURATION, value))
+    row[column] = value
+  if kind == 'shows':
+    for ref in ('venue', 'artist'):
+      row[ref + '_name'] = record.get(ref + '_name') or None
+  return row, parse_genres(record.get('genres'))
+
+
+def apply_defaults(table, rows):
+  # COPY bypasses SQLAlchemy, so Python-side column defaults are filled in
+  # here; executemany would apply them itself but it does no harm
+  for column in table.columns:
+    default = column.default
+    if default is None or column.primary_key or not (default.is_scalar or default.is_callable):
+      continue
+    for row in rows:
+      if row.get(column.name) is None:
+        row[column.name] = default.arg if default.is_scalar else default.arg(None)
+  return rows
+
+
+class Importer(object):
+
+  def __init__(self, engine, tables, chunk_size=5000, rejects=None, counters=None):
+    # tables maps table names ('Venue', 'Genre', 'VenueGenre', ...) to Table
+    # objects; rejects is a writable file for rejected records, or None.
+    # counters is the app's ShowCounters, so imports roll the watermark on
+    # its COUNTERS_ROLL_INTERVAL; one with the default interval otherwise.
+    self.engine = engine
+    self.tables = tables
+    self.counters = counters or ShowCounters(tables)
+    self.chunk_size = chunk_size
+    self.rejects = rejects
+    self.use_copy = engine.dialect.name == 'postgresql'
+
+  def run(self, kind, records):
+    stats = {'inserted': 0, 'rejected': 0}
+    for chunk in chunked(records, self.chunk_size):
+      rows = []
+      for line_no, record in chunk:
+        try:
+          if isinstance(record, Reject):
+            raise record
+          rows.append((line_no, record) + clean(kind, record))
+        except Reject as e:
+          self.reject(stats, line_no, record, str(e))
+      if rows:
+        self.load(kind, rows, stats)
+    return stats
+
+  def reject(self, stats, line_no, record, reason):
+    stats['rejected'] += 1
+    if self.rejects is not None:
+      self.rejects.write(json.dumps({
+        'line': line_no,
+        'reason': reason,
+        'record': None if isinstance(record, Reject) else record,
+      }, default=str) + '\n')
+
+  def load(self, kind, rows, stats):
+    try:
+      with self.engine.begin() as conn:
+        inserted, rejected = self.insert(conn, kind, rows)
+    except Exception as e:
+      if len(rows) == 1:
+        line_no, record = rows[0][:2]
+        self.reject(stats, line_no, record, 'refused by the database: {}'.format(
+          str(getattr(e, 'orig', e)).strip()))
+        return
+      # find the offending rows one at a time; the rest still go in
+      for row in rows:
+        self.load(kind, [row], stats)
+      return
+    stats['inserted'] += inserted
+    for line_no, record, reason in rejected:
+      self.reject(stats, line_no, record, reason)
+
+  def insert(self, conn, kind, rows):
+    # returns the number of rows written and [(line, record, reason)] for
+    # the ones left out; rows are not modified so a failed chunk can be
+    # retried row by row
+    table = self.tables[TABLES[kind]]
+    if kind == 'shows':
+      values, rejected = self.resolve_references(conn, rows)
+      refused = set(line_no for line_no, _, _ in rejected)
+      lines = [(line_no, record) for line_no, record, _, _ in rows if line_no not in refused]
+      values = apply_defaults(table, values)
+      # double bookings, checked as create_shows_batch does
+      clashes = batch_conflicts(conn, table, values)
+      rejected += [(line_no, record, overlap_reason(clash))
+                   for (line_no, record), clash in zip(lines, clashes) if clash]
+      values = [row for row, clash in zip(values, clashes) if not clash]
+      self.write(conn, table, values)
+      self.counters.record(conn, values)
+      return len(values), rejected
+
+    ids = self.allocate_ids(conn, table, len(rows))
+    values = [dict(row, id=id) for id, (_, _, row, _) in zip(ids, rows)]
+    self.write(conn, table, apply_defaults(table, values))
+    self.link_genres(conn, kind, [(id, genres) for id, (_, _, _, genres) in zip(ids, rows)])
+    return len(values), []
+
+  def allocate_ids(self, conn, table, count):
+    # ids are assigned up front so genre links can be written in the same
+    # chunk without RETURNING. Outside Postgres this assumes no other
+    # writer is inserting into the table during the import.
+    if conn.dialect.name == 'postgresql':
+      return [id for id, in conn.execute(text(
+        "SELECT nextval(pg_get_serial_sequence('\"{}\"', 'id')) "
+        "FROM generate_series(1, :count)".format(table.name)), count=count)]
+    start = conn.execute(select([func.max(table.c.id)])).scalar() or 0
+    return list(range(start + 1, start + count + 1))
+
+  def resolve_references(self, conn, rows):
+    # one IN query per referenced table per chunk
+    lookups = {}
+    for ref, table_name in (('venue', 'Venue'), ('artist', 'Artist')):
+      table = self.tables[table_name]
+      ids = set(r[2][ref + '_id'] for r in rows if r[2][ref + '_id'] is not None)
+      names = set(r[2][ref + '_name'] for r in rows if r[2][ref + '_id'] is None)
+      known_ids = set()
+      if ids:
+        known_ids = set(id for id, in conn.execute(select([table.c.id]).where(table.c.id.in_(ids))))
+      by_name = {}
+      if names:
+        for id, name in conn.execute(select([table.c.id, table.c.name]).where(table.c.name.in_(names))):
+          # a name shared by several rows cannot be resolved
+          by_name[name] = None if name in by_name else id
+      lookups[ref] = (known_ids, by_name)
+
+    values = []
+    rejected = []
+    for line_no, record, row, _ in rows:
+      row = dict(row)
+      try:
+        for ref in ('venue', 'artist'):
+          known_ids, by_name = lookups[ref]
+          name = row.pop(ref + '_name')
+          if row[ref + '_id'] is None:
+            if by_name.get(name) is None:
+              raise Reject('{} {!r} {}'.format(ref, name, 'is ambiguous' if name in by_name else 'not found'))
+            row[ref + '_id'] = by_name[name]
+          elif row[ref + '_id'] not in known_ids:
+            raise Reject('{}_id {} not found'.format(ref, row[ref + '_id']))
+        values.append(row)
+      except Reject as e:
+        rejected.append((line_no, record, str(e)))
+    return values, rejected
+
+  def link_genres(self, conn, kind, members):
+    names = set(name for _, genres in members for name in genres)
+    if not names:
+      return
+    genre = self.tables['Genre']
+    existing = dict((n, id) for id, n in conn.execute(
+      select([genre.c.id, genre.c.name]).where(genre.c.name.in_(names))))
+    missing = names - set(existing)
+    if missing:
+      conn.execute(genre.insert(), [{'name': n} for n in sorted(missing)])
+      existing.update((n, id) for id, n in conn.execute(
+        select([genre.c.id, genre.c.name]).where(genre.c.name.in_(missing))))
+    key = kind[:-1] + '_id'
+    association = self.tables[TABLES[kind] + 'Genre']
+    self.write(conn, association, [
+      {key: id, 'genre_id': existing[name]} for id, genres in members for name in genres])
+
+  def write(self, conn, table, rows):
+    if not rows:
+      return
+    if not self.use_copy:
+      conn.execute(table.insert(), rows)
+      return
+    columns = list(rows[0].keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+      writer.writerow(['\\N' if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+    cursor = conn.connection.cursor()
+    cursor.copy_expert('COPY "{}" ({}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')'.format(
+      table.name, ', '.join('"{}"'.format(c) for c in columns)), buffer)
@@ -0,0 +1,220 @@
+#----------------------------------------------------------------------------#
+# Per-request instrumentation.
+#
+# Engine events count every SQL statement a request issues and time it, and
+# a Template subclass times rendering. after_request sends the totals so far
+# to the client as a Server-Timing header. Once the response is closed, when
+# a streamed body has been sent and its queries have run too, they are
+# logged (also as the record's `request` fields, for the JSON log) and
+# folded into per-route latency histograms that /metrics serves in
+# Prometheus text format alongside connection-pool gauges.
+#----------------------------------------------------------------------------#
+
+import heapq
+import threading
+import time
+
+from flask import g, has_request_context, request
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# request latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class TimedTemplate(Template):
+  # adds the time spent rendering to the current request's totals
+
+  def render(self, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+      return super(TimedTemplate, self).render(*args, **kwargs)
+    finally:
+      if has_request_context() and hasattr(g, 'metrics'):
+        g.metrics['render_time'] += time.perf_counter() - start
+
+  def generate(self, *args, **kwargs):
+    # a streamed render runs chunk by chunk as the body is sent; queries a
+    # chunk runs (a yield_per listing) count as db time, not render time
+    metrics = g.get('metrics') if has_request_context() else None
+    chunks = super(TimedTemplate, self).generate(*args, **kwargs)
+    while True:
+      start = time.perf_counter()
+      db_time = metrics['db_time'] if metrics else 0.0
+      try:
+        chunk = next(chunks)
+      except StopIteration:
+        return
+      finally:
+        if metrics is not None:
+          metrics['render_time'] += time.perf_counter() - start - (metrics['db_time'] - db_time)
+      yield chunk
+
+
+class Histogram(object):
+
+  def __init__(self, buckets=BUCKETS):
+    self.buckets = buckets
+    self.counts = [0] * (len(buckets) + 1)
+    self.sum = 0.0
+    self.count = 0
+
+  def observe(self, value):
+    for i, bound in enumerate(self.buckets):
+      if value <= bound:
+        self.counts[i] += 1
+        break
+    else:
+      self.counts[-1] += 1
+    self.sum += value
+    self.count += 1
+
+  def cumulative(self):
+    total = 0
+    for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+      total += count
+      yield ('+Inf' if bound == float('inf') else repr(bound)), total
+
+
+class RequestMetrics(object):
+
+  def __init__(self, app=None, engines=None, slowest=3):
+    self.slowest = slowest
+    self.engines = engines or (lambda: [])
+    self.latency = {}
+    self.queries = {}
+    self.db_time = {}
+    self.gauges = []
+    self._lock = threading.Lock()
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    self.slowest = app.config.get('METRICS_SLOWEST_STATEMENTS', self.slowest)
+    self.logger = app.logger
+    # the listeners are global, so each create_app() must not add them again
+    if not event.contains(Engine, 'before_cursor_execute', self._before_cursor_execute):
+      event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+      event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+    app.jinja_env.template_class = TimedTemplate
+    app.before_request(self._start_request)
+    app.after_request(self._finish_request)
+
+  def gauge(self, name, help, fn, type='gauge'):
+    # registers an extra metric for /metrics; fn() returns its current value
+    self.gauges.append((name, help, fn, type))
+
+  def _start_request(self):
+    g.metrics = {
+      'start': time.perf_counter(),
+      'query_count': 0,
+      'db_time': 0.0,
+      'render_time': 0.0,
+      'slowest': [],
+    }
+
+  def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+  def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    if not has_request_context() or not hasattr(g, 'metrics'):
+      return
+    metrics = g.metrics
+    metrics['query_count'] += 1
+    metrics['db_time'] += elapsed
+    # min-heap of the slowest statements seen so far in this request
+    entry = (elapsed, metrics['query_count'], statement)
+    if len(metrics['slowest']) < self.slowest:
+      heapq.heappush(metrics['slowest'], entry)
+    else:
+      heapq.heappushpop(metrics['slowest'], entry)
+
+  def _finish_request(self, response):
+    metrics = g.get('metrics')
+    if metrics is None:
+      return response
+    # a streamed body has yet to run its queries and render, so the header
+    # has the totals so far and the rest is recorded on close
+    response.headers['Server-Timing'] = ', '.join([
+      'db;dur={:.2f};desc="{} queries"'.format(metrics['db_time'] * 1000, metrics['query_count']),
+      'render;dur={:.2f}'.format(metrics['render_time'] * 1000),
+      'total;dur={:.2f}'.format((time.perf_counter() - metrics['start']) * 1000),
+    ])
+    route = request.url_rule.endpoint if request.url_rule else 'unmatched'
+    method, path, status = request.method, request.path, response.status_code
+    response.call_on_close(lambda: self._record(metrics, route, method, path, status))
+    return response
+
+  def _record(self, metrics, route, method, path, status):
+    total = time.perf_counter() - metrics['start']
+    with self._lock:
+      self.latency.setdefault(route, Histogram()).observe(total)
+      self.queries[route] = self.queries.get(route, 0) + metrics['query_count']
+      self.db_time[route] = self.db_time.get(route, 0.0) + metrics['db_time']
+
+    self.logger.info(
+      '%s %s %s route=%s queries=%d db=%.1fms render=%.1fms total=%.1fms',
+      method, path, status, route,
+      metrics['query_count'], metrics['db_time'] * 1000,
+      metrics['render_time'] * 1000, total * 1000, extra={'request': {
+        'method': method,
+        'path': path,
+        'status': status,
+        'route': route,
+        'queries': metrics['query_count'],
+        'db_ms': round(metrics['db_time'] * 1000, 3),
+        'render_ms': round(metrics['render_time'] * 1000, 3),
+        'duration_ms': round(total * 1000, 3),
+      }})
+    for elapsed, _, statement in sorted(metrics['slowest'], reverse=True):
+      self.logger.debug('  %.1fms %s', elapsed * 1000, ' '.join(statement.split()))
+
+  def render(self):
+    # the current metrics in Prometheus text exposition format
+    lines = [
+      '# HELP fyyur_request_duration_seconds Request latency by route.',
+      '# TYPE fyyur_request_duration_seconds histogram',
+    ]
+    with self._lock:
+      for route, histogram in sorted(self.latency.items()):
+        for le, count in histogram.cumulative():
+          lines.append('fyyur_request_duration_seconds_bucket{{route="{}",le="{}"}} {}'.format(route, le, count))
+        lines.append('fyyur_request_duration_seconds_sum{{route="{}"}} {:.6f}'.format(route, histogram.sum))
+        lines.append('fyyur_request_duration_seconds_count{{route="{}"}} {}'.format(route, histogram.count))
+      lines += [
+        '# HELP fyyur_db_queries_total SQL statements issued, by route.',
+        '# TYPE fyyur_db_queries_total counter',
+      ]
+      lines += ['fyyur_db_queries_total{{route="{}"}} {}'.format(r, n) for r, n in sorted(self.queries.items())]
+      lines += [
+        '# HELP fyyur_db_duration_seconds_total Time spent in SQL statements, by route.',
+        '# TYPE fyyur_db_duration_seconds_total counter',
+      ]
+      lines += ['fyyur_db_duration_seconds_total{{route="{}"}} {:.6f}'.format(r, t) for r, t in sorted(self.db_time.items())]
+
+    lines += self._pool_lines()
+    for name, help, fn, type in self.gauges:
+      lines += ['# HELP {} {}'.format(name, help), '# TYPE {} {}'.format(name, type), '{} {}'.format(name, fn())]
+    return '\n'.join(lines) + '\n'
+
+  def _pool_lines(self):
+    # QueuePool exposes its size and usage; SQLite's pools do not
+    stats = (
+      ('size', 'Configured pool size.'),
+      ('checkedout', 'Connections in use.'),
+      ('checkedin', 'Idle connections in the pool.'),
+      ('overflow', 'Connections open beyond the pool size.'),
+    )
+    lines = []
+    for stat, help in stats:
+      values = []
+      for name, engine in self.engines():
+        fn = getattr(engine.pool, stat, None)
+        if callable(fn):
+          values.append('fyyur_db_pool_{}{{engine="{}"}} {}'.format(stat, name, fn()))
+      if values:
+        lines += ['# HELP fyyur_db_pool_{} {}'.format(stat, help), '# TYPE fyyur_db_pool_{} gauge'.format(stat)]
+        lines += values
+    return lines
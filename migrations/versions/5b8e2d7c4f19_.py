@@ -0,0 +1,24 @@
+"""time of the latest deletion, for Last-Modified
+
+Revision ID: 5b8e2d7c4f19
+Revises: a1d9e3c5f706
+Create Date: 2026-10-19 16:05:48.217630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e2d7c4f19'
+down_revision = 'a1d9e3c5f706'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('DeletionCounter', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('DeletionCounter', 'deleted_at')
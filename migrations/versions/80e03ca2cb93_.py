@@ -0,0 +1,101 @@
+"""move venue and artist genres into Genre and association tables
+
+Revision ID: 80e03ca2cb93
+Revises: 722fecac2d7d
+Create Date: 2026-10-18 11:21:05.664310
+
+"""
+import csv
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '80e03ca2cb93'
+down_revision = '722fecac2d7d'
+branch_labels = None
+depends_on = None
+
+genre = sa.table('Genre', sa.column('id', sa.Integer), sa.column('name', sa.String))
+
+
+def parse_genres(value):
+    # genres were stored as Postgres array literals, e.g. '{Jazz,"Hip-Hop"}'
+    if not value or value in ('{}', '{""}'):
+        return []
+    reader = csv.reader([value.strip('{}')], escapechar='\\')
+    return [name.strip() for name in next(reader) if name.strip()]
+
+
+def format_genres(names):
+    return '{' + ','.join('"{}"'.format(n) if ',' in n or ' ' in n else n for n in names) + '}'
+
+
+def upgrade():
+    op.create_table('Genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('ArtistGenre',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ),
+    sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ),
+    sa.PrimaryKeyConstraint('artist_id', 'genre_id')
+    )
+    op.create_index('ix_ArtistGenre_genre_id_artist_id', 'ArtistGenre', ['genre_id', 'artist_id'], unique=False)
+    op.create_table('VenueGenre',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ),
+    sa.PrimaryKeyConstraint('venue_id', 'genre_id')
+    )
+    op.create_index('ix_VenueGenre_genre_id_venue_id', 'VenueGenre', ['genre_id', 'venue_id'], unique=False)
+
+    # data migration: split the old string columns into rows
+    conn = op.get_bind()
+    members = {}
+    for table, key in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        rows = conn.execute(sa.text('SELECT id, genres FROM "{}"'.format(table)))
+        members[table] = [(id, name) for id, value in rows for name in parse_genres(value)]
+
+    names = sorted(set(name for rows in members.values() for _, name in rows))
+    if names:
+        op.bulk_insert(genre, [{'name': n} for n in names])
+    genre_ids = dict((name, id) for id, name in conn.execute(sa.select([genre.c.id, genre.c.name])))
+
+    for table, key in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        association = sa.table(table + 'Genre', sa.column(key, sa.Integer), sa.column('genre_id', sa.Integer))
+        rows = set((id, genre_ids[name]) for id, name in members[table])
+        if rows:
+            op.bulk_insert(association, [{key: id, 'genre_id': g} for id, g in sorted(rows)])
+
+    op.drop_column('Venue', 'genres')
+    op.drop_column('Artist', 'genres')
+
+
+def downgrade():
+    op.add_column('Artist', sa.Column('genres', sa.String(length=120), nullable=True))
+    op.add_column('Venue', sa.Column('genres', sa.String(length=120), nullable=True))
+
+    conn = op.get_bind()
+    for table, key in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        rows = conn.execute(sa.text(
+            'SELECT a.{key}, g.name FROM "{table}Genre" a JOIN "Genre" g ON g.id = a.genre_id '
+            'ORDER BY a.{key}, g.name'.format(key=key, table=table)))
+        genres = {}
+        for id, name in rows:
+            genres.setdefault(id, []).append(name)
+        for id, names in genres.items():
+            conn.execute(sa.text('UPDATE "{}" SET genres = :genres WHERE id = :id'.format(table)),
+                         genres=format_genres(names), id=id)
+
+    op.drop_index('ix_VenueGenre_genre_id_venue_id', table_name='VenueGenre')
+    op.drop_table('VenueGenre')
+    op.drop_index('ix_ArtistGenre_genre_id_artist_id', table_name='ArtistGenre')
+    op.drop_table('ArtistGenre')
+    op.drop_table('Genre')
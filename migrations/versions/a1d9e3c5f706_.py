@@ -0,0 +1,29 @@
+"""deletion counters for the listing validators
+
+Revision ID: a1d9e3c5f706
+Revises: f2a6c84d1b37
+Create Date: 2026-10-19 10:12:37.905114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1d9e3c5f706'
+down_revision = 'f2a6c84d1b37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    table = op.create_table('DeletionCounter',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('deleted', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    op.bulk_insert(table, [{'table_name': name, 'deleted': 0} for name in ('Venue', 'Artist', 'Show')])
+
+
+def downgrade():
+    op.drop_table('DeletionCounter')
@@ -0,0 +1,46 @@
+"""upcoming and past show counters on Venue and Artist
+
+Revision ID: a52e07d4c913
+Revises: 3f1c9a7e5b24
+Create Date: 2026-10-18 17:14:08.902615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a52e07d4c913'
+down_revision = '3f1c9a7e5b24'
+branch_labels = None
+depends_on = None
+
+MEMBERS = (('Venue', 'venue_id'), ('Artist', 'artist_id'))
+
+
+def upgrade():
+    op.create_table('ShowCounterWatermark',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('rolled_until', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # start times are local, so the watermark is too
+    op.execute('INSERT INTO "ShowCounterWatermark" (id, rolled_until) VALUES (1, LOCALTIMESTAMP)')
+
+    for table, key in MEMBERS:
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.execute('''
+            UPDATE "{table}" SET
+              upcoming_shows_count = (SELECT count(*) FROM "Show" WHERE "Show".{key} = "{table}".id
+                                      AND "Show".start_time >= (SELECT rolled_until FROM "ShowCounterWatermark")),
+              past_shows_count = (SELECT count(*) FROM "Show" WHERE "Show".{key} = "{table}".id
+                                  AND "Show".start_time < (SELECT rolled_until FROM "ShowCounterWatermark"))
+        '''.format(table=table, key=key))
+
+
+def downgrade():
+    for table, _ in reversed(MEMBERS):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
+    op.drop_table('ShowCounterWatermark')
@@ -0,0 +1,41 @@
+"""trigram and full-text indexes for venue and artist name search
+
+Revision ID: b974e2dbc6ec
+Revises: d09d3a98a059
+Create Date: 2026-10-18 09:12:40.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b974e2dbc6ec'
+down_revision = 'd09d3a98a059'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm and tsvector are Postgres only; other databases search through
+    # the in-process index in search.py and just get a plain name index.
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index('ix_Venue_name_trgm', 'Venue', ['name'])
+        op.create_index('ix_Artist_name_trgm', 'Artist', ['name'])
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in ('Venue', 'Artist'):
+        op.create_index('ix_{}_name_trgm'.format(table), table, ['name'],
+                        postgresql_using='gin',
+                        postgresql_ops={'name': 'gin_trgm_ops'})
+        op.create_index('ix_{}_name_tsv'.format(table), table,
+                        [sa.text("to_tsvector('simple', name)")],
+                        postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_Artist_name_tsv', table_name='Artist')
+        op.drop_index('ix_Venue_name_tsv', table_name='Venue')
+    op.drop_index('ix_Artist_name_trgm', table_name='Artist')
+    op.drop_index('ix_Venue_name_trgm', table_name='Venue')
@@ -0,0 +1,41 @@
+"""show durations, and exclusion constraints against double bookings
+
+Revision ID: e81b5a0c93d4
+Revises: c7d2f4b81e06
+Create Date: 2026-10-18 19:02:51.640213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e81b5a0c93d4'
+down_revision = 'c7d2f4b81e06'
+branch_labels = None
+depends_on = None
+
+# a show's [start, end) as a range; start_time has no time zone, so tsrange
+DURING = "tsrange(start_time, start_time + duration * interval '1 minute')"
+
+
+def upgrade():
+    op.add_column('Show', sa.Column('duration', sa.Integer(), server_default='120', nullable=False))
+    op.create_check_constraint('ck_Show_duration', 'Show', 'duration > 0 AND duration <= 1440')
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # btree_gist lets the gist index behind each constraint take the
+    # integer equality on venue_id or artist_id. Existing overlaps must be
+    # removed first: `flask conflicts` lists them.
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for key in ('venue_id', 'artist_id'):
+        op.execute('ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_{0}_during" '
+                   'EXCLUDE USING gist ({0} WITH =, {1} WITH &&)'.format(key, DURING))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for key in ('artist_id', 'venue_id'):
+            op.execute('ALTER TABLE "Show" DROP CONSTRAINT "ex_Show_{}_during"'.format(key))
+    op.drop_constraint('ck_Show_duration', 'Show', type_='check')
+    op.drop_column('Show', 'duration')
@@ -0,0 +1,52 @@
+"""ON DELETE CASCADE from venues and artists to their shows and genre tags
+
+Revision ID: f2a6c84d1b37
+Revises: e81b5a0c93d4
+Create Date: 2026-10-18 21:40:12.318504
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a6c84d1b37'
+down_revision = 'e81b5a0c93d4'
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table) of each foreign key that cascades
+CASCADES = (
+    ('Show', 'venue_id', 'Venue'),
+    ('Show', 'artist_id', 'Artist'),
+    ('VenueGenre', 'venue_id', 'Venue'),
+    ('ArtistGenre', 'artist_id', 'Artist'),
+)
+
+# SQLite's foreign keys have no names; batch mode rebuilds the table with
+# these, and Postgres named them the same way when the tables were created
+NAMING_CONVENTION = {'fk': '%(table_name)s_%(column_0_name)s_fkey'}
+# CHECK constraints are not reflected from SQLite, so the rebuilt table
+# is given its own again
+TABLE_ARGS = {
+    'Show': (sa.CheckConstraint('duration > 0 AND duration <= 1440', name='ck_Show_duration'),),
+}
+
+
+def replace_foreign_keys(ondelete):
+    for table in ('Show', 'VenueGenre', 'ArtistGenre'):
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION,
+                                  table_args=TABLE_ARGS.get(table, ())) as batch_op:
+            for name, column, referred in CASCADES:
+                if name == table:
+                    constraint = '{}_{}_fkey'.format(table, column)
+                    batch_op.drop_constraint(constraint, type_='foreignkey')
+                    batch_op.create_foreign_key(constraint, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    replace_foreign_keys(None)
@@ -0,0 +1,143 @@
+#----------------------------------------------------------------------------#
+# Models.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+
+from extensions import db
+from schedule import DEFAULT_DURATION, MAX_DURATION
+
+venue_genres = db.Table('VenueGenre',
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete = 'CASCADE'), primary_key = True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key = True),
+    db.Index('ix_VenueGenre_genre_id_venue_id', 'genre_id', 'venue_id'),
+)
+
+artist_genres = db.Table('ArtistGenre',
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete = 'CASCADE'), primary_key = True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key = True),
+    db.Index('ix_ArtistGenre_genre_id_artist_id', 'genre_id', 'artist_id'),
+)
+
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable = False, unique = True)
+
+    @classmethod
+    def from_names(cls, names):
+        # Genre rows for names, creating the ones that do not exist yet
+        names = set(n.strip() for n in names if n.strip())
+        if not names:
+            return []
+        genres = cls.query.filter(cls.name.in_(names)).all()
+        known = set(g.name for g in genres)
+        genres += [cls(name = n) for n in sorted(names - known)]
+        return genres
+
+class Venue(db.Model):
+    __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_Venue_name_trgm', 'name', postgresql_using = 'gin', postgresql_ops = {'name': 'gin_trgm_ops'}),
+        db.Index('ix_Venue_updated_at', 'updated_at'),
+        db.Index('ix_Venue_state_city', 'state', 'city'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable = False)
+    genres = db.relationship('Genre', secondary = venue_genres, lazy = True, passive_deletes = True)
+    city = db.Column(db.String(120), nullable = False)
+    state = db.Column(db.String(120), nullable = False)
+    address = db.Column(db.String(120), nullable = False)
+    phone = db.Column(db.String(120), nullable = False)
+    image_link = db.Column(db.String(500), nullable = True)
+    facebook_link = db.Column(db.String(120), nullable = True)
+    website_link = db.Column(db.String(120), nullable = True)
+    seeking_talent = db.Column(db.Boolean, nullable = True)
+    seeking_description = db.Column(db.String(120), nullable = True)
+    updated_at = db.Column(db.DateTime, nullable = False, default = datetime.utcnow, onupdate = datetime.utcnow)
+    # maintained by show_counters
+    upcoming_shows_count = db.Column(db.Integer, nullable = False, default = 0, server_default = '0')
+    past_shows_count = db.Column(db.Integer, nullable = False, default = 0, server_default = '0')
+    # shows and genre tags are removed by ON DELETE CASCADE (migration
+    # f2a6c84d1b37), so deleting a venue or artist loads neither
+    shows = db.relationship('Show', backref = 'venue', cascade='all,delete', lazy = True, passive_deletes = True)
+    # TODO: implement any missing fields, as a database migration using Flask-Migrate
+
+class Artist(db.Model):
+    __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_Artist_name_trgm', 'name', postgresql_using = 'gin', postgresql_ops = {'name': 'gin_trgm_ops'}),
+        db.Index('ix_Artist_updated_at', 'updated_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable = False)
+    city = db.Column(db.String(120), nullable = False)
+    state = db.Column(db.String(120), nullable = False)
+    phone = db.Column(db.String(120), nullable = False)
+    genres = db.relationship('Genre', secondary = artist_genres, lazy = True, passive_deletes = True)
+    image_link = db.Column(db.String(500), nullable = True)
+    facebook_link = db.Column(db.String(120), nullable = True)
+    website_link = db.Column(db.String(120), nullable = True)
+    seeking_venue = db.Column(db.Boolean, nullable = True)
+    seeking_description = db.Column(db.String(120), nullable = True)
+    updated_at = db.Column(db.DateTime, nullable = False, default = datetime.utcnow, onupdate = datetime.utcnow)
+    # maintained by show_counters
+    upcoming_shows_count = db.Column(db.Integer, nullable = False, default = 0, server_default = '0')
+    past_shows_count = db.Column(db.Integer, nullable = False, default = 0, server_default = '0')
+    shows = db.relationship('Show', backref = 'artist', cascade='all,delete', lazy = True, passive_deletes = True)
+    # TODO: implement any missing fields, as a database migration using Flask-Migrate
+
+# TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
+class Show(db.Model):
+   __tablename__ = 'Show'
+   __table_args__ = (
+       db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+       db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+       db.Index('ix_Show_start_time', 'start_time'),
+       db.Index('ix_Show_updated_at', 'updated_at'),
+       # on Postgres, exclusion constraints also refuse overlapping shows
+       # (migration e81b5a0c93d4, see schedule.py)
+       db.CheckConstraint('duration > 0 AND duration <= {}'.format(MAX_DURATION), name = 'ck_Show_duration'),
+   )
+
+   id = db.Column(db.Integer, primary_key=True)
+   start_time = db.Column(db.DateTime, nullable = False)
+   venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete = 'CASCADE'), nullable = False)
+   artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete = 'CASCADE'), nullable =False)
+   # minutes
+   duration = db.Column(db.Integer, nullable = False, default = DEFAULT_DURATION, server_default = str(DEFAULT_DURATION))
+   updated_at = db.Column(db.DateTime, nullable = False, default = datetime.utcnow, onupdate = datetime.utcnow)
+
+class ShowCounterWatermark(db.Model):
+    # a single row: shows starting before rolled_until are counted as past
+    # in the Venue and Artist show counters, the rest as upcoming
+    __tablename__ = 'ShowCounterWatermark'
+
+    id = db.Column(db.Integer, primary_key=True)
+    rolled_until = db.Column(db.DateTime, nullable = False)
+
+class DeletionCounter(db.Model):
+    # rows deleted from each table, counted and timed by the write paths
+    # that delete: a deletion leaves max(updated_at) as it was, so the
+    # validators read the count for the ETag and the time for Last-Modified
+    __tablename__ = 'DeletionCounter'
+
+    table_name = db.Column(db.String(64), primary_key = True)
+    deleted = db.Column(db.Integer, nullable = False, default = 0, server_default = '0')
+    # UTC, like updated_at; None until the first deletion
+    deleted_at = db.Column(db.DateTime)
+
+    @classmethod
+    def record(cls, conn, *table_names):
+        # counts a deletion from each table in the caller's transaction;
+        # the rows are created by migration, or here on first use
+        table = cls.__table__
+        now = datetime.utcnow()
+        for name in table_names:
+            update = table.update().where(table.c.table_name == name).values(
+                deleted = table.c.deleted + 1, deleted_at = now)
+            if not conn.execute(update).rowcount:
+                conn.execute(table.insert(), table_name = name, deleted = 1, deleted_at = now)
@@ -0,0 +1,129 @@
+#----------------------------------------------------------------------------#
+# Non-blocking structured logging.
+#
+# app.logger hands its records to a bounded queue and returns; a
+# QueueListener thread writes them to a rotating file as JSON lines, so a
+# slow disk delays the log, not the request. When the queue is full new
+# records are dropped and counted rather than waited on. Request lines
+# carry the route, status, duration and database time as fields (see
+# RequestMetrics), slow-query lines their statement and plan (see
+# SlowQueryLog), and successful requests can be sampled.
+#----------------------------------------------------------------------------#
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+from flask.logging import default_handler
+
+
+class JSONFormatter(logging.Formatter):
+
+  def format(self, record):
+    line = {
+      'time': datetime.utcfromtimestamp(record.created).isoformat() + 'Z',
+      'level': record.levelname,
+      'logger': record.name,
+      'message': record.getMessage(),
+    }
+    # the fields of the request or slow query the record describes
+    line.update(getattr(record, 'request', None) or {})
+    line.update(getattr(record, 'query', None) or {})
+    if record.exc_text:
+      line['exc'] = record.exc_text
+    return json.dumps(line, default=str)
+
+
+class SuccessSampler(logging.Filter):
+  # keeps a share rate of the request records with a status below 400;
+  # errors and everything else always pass
+
+  def __init__(self, rate):
+    super(SuccessSampler, self).__init__()
+    self.rate = rate
+
+  def filter(self, record):
+    fields = getattr(record, 'request', None)
+    if not fields or fields.get('status', 500) >= 400:
+      return True
+    return self.rate >= 1 or random.random() < self.rate
+
+
+class DroppingQueueHandler(QueueHandler):
+
+  def __init__(self, queue):
+    super(DroppingQueueHandler, self).__init__(queue)
+    self.dropped = 0
+
+  def prepare(self, record):
+    # the record is written by another thread, after the request has moved
+    # on: the message and traceback are rendered now, while its arguments
+    # and exc_info still mean what they did
+    record = copy.copy(record)
+    record.msg = record.getMessage()
+    record.args = None
+    if record.exc_info and not record.exc_text:
+      record.exc_text = logging.Formatter().formatException(record.exc_info)
+    record.exc_info = None
+    return record
+
+  def enqueue(self, record):
+    try:
+      self.queue.put_nowait(record)
+    except queue.Full:
+      self.dropped += 1
+
+
+class RequestLog(object):
+
+  def __init__(self, app=None):
+    self.handlers = []
+    self._listeners = []
+    if app is not None:
+      self.init_app(app)
+
+  @property
+  def dropped(self):
+    return sum(handler.dropped for handler in self.handlers)
+
+  def file_handler(self, config):
+    if config['LOG_ROTATE_WHEN']:
+      return TimedRotatingFileHandler(
+        config['LOG_FILE'], when=config['LOG_ROTATE_WHEN'], backupCount=config['LOG_BACKUP_COUNT'])
+    return RotatingFileHandler(
+      config['LOG_FILE'], maxBytes=config['LOG_MAX_BYTES'], backupCount=config['LOG_BACKUP_COUNT'])
+
+  def init_app(self, app):
+    target = self.file_handler(app.config)
+    target.setFormatter(JSONFormatter())
+    records = queue.Queue(app.config['LOG_QUEUE_SIZE'])
+    handler = DroppingQueueHandler(records)
+    # sampled out before the queue, so skipped lines cost nothing more
+    handler.addFilter(SuccessSampler(app.config['LOG_SUCCESS_SAMPLE_RATE']))
+    listener = QueueListener(records, target)
+    listener.start()
+    # flushes what is still queued when the worker exits
+    atexit.register(listener.stop)
+    app.logger.setLevel(getattr(logging, app.config['LOG_LEVEL']))
+    # Flask's stderr handler would write on the request thread too
+    app.logger.removeHandler(default_handler)
+    app.logger.addHandler(handler)
+    self.handlers.append(handler)
+    self._listeners.append((app.logger, handler, listener))
+
+  def close(self):
+    # writes out what is queued and detaches the handlers, as at exit; for
+    # a process that creates apps one after another, such as a test run.
+    # The dropped count is kept.
+    for logger, handler, listener in self._listeners:
+      logger.removeHandler(handler)
+      atexit.unregister(listener.stop)
+      listener.stop()
+      for target in listener.handlers:
+        target.close()
+    self._listeners = []
@@ -0,0 +1,125 @@
+#----------------------------------------------------------------------------#
+# Read/write routing between the primary database and a read replica.
+#
+# The replica is an ordinary Flask-SQLAlchemy bind (SQLALCHEMY_BINDS
+# ['replica']) that no model is mapped to. Views marked @read_only send
+# their queries to it; everything else, and every flush, goes to the
+# primary. Once a request commits, the client is pinned to the primary for
+# REPLICA_STICKY_SECONDS with a cookie, so the page it is redirected to
+# shows its own write even while the replica lags behind.
+#----------------------------------------------------------------------------#
+
+import math
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import event, orm
+from sqlalchemy.engine.url import make_url
+
+REPLICA = 'replica'
+STICKY_COOKIE = 'db_primary_until'
+
+
+def read_only(view):
+  # marks a view whose queries may be served by the replica
+  @wraps(view)
+  def wrapper(*args, **kwargs):
+    g.db_read_only = True
+    return view(*args, **kwargs)
+  return wrapper
+
+
+def _enable_foreign_keys(dbapi_connection, connection_record):
+  # SQLite enforces foreign keys, ON DELETE CASCADE included, only on
+  # connections that ask for it
+  cursor = dbapi_connection.cursor()
+  cursor.execute('PRAGMA foreign_keys = ON')
+  cursor.close()
+
+
+def pinned_to_primary(cookies=None):
+  # the cookie is unsigned: forging it can only send reads to the primary.
+  # cookies defaults to the current Flask request's.
+  if cookies is None:
+    cookies = request.cookies
+  try:
+    return float(cookies.get(STICKY_COOKIE, 0)) > time.time()
+  except ValueError:
+    return False
+
+
+def use_replica():
+  return (has_request_context() and g.get('db_read_only', False)
+          and not g.get('db_wrote', False) and not pinned_to_primary())
+
+
+class RoutingSession(SignallingSession):
+
+  def get_bind(self, mapper=None, clause=None):
+    db = get_state(self.app).db
+    if not self._flushing and db.has_replica(self.app) and use_replica():
+      return db.get_engine(self.app, bind=REPLICA)
+    return super(RoutingSession, self).get_bind(mapper, clause)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _record_write(session):
+  if has_request_context():
+    g.db_wrote = True
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+  def init_app(self, app):
+    super(RoutingSQLAlchemy, self).init_app(app)
+    app.after_request(self._pin_to_primary)
+
+  def create_session(self, options):
+    return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+  def has_replica(self, app=None):
+    return REPLICA in (self.get_app(app).config.get('SQLALCHEMY_BINDS') or {})
+
+  def pinned(self):
+    # whether the current request reads the primary only because it or its
+    # client has just written; page_cache neither reads nor writes for it
+    return (has_request_context() and self.has_replica()
+            and (g.get('db_wrote', False) or pinned_to_primary()))
+
+  def lagging(self):
+    # whether the current request reads the replica
+    return self.has_replica() and use_replica()
+
+  def engines(self, app=None):
+    # (name, engine) pairs, for pool metrics
+    engines = [('primary', self.get_engine(app))]
+    if self.has_replica(app):
+      engines.append((REPLICA, self.get_engine(app, bind=REPLICA)))
+    return engines
+
+  def apply_driver_hacks(self, app, sa_url, options):
+    super(RoutingSQLAlchemy, self).apply_driver_hacks(app, sa_url, options)
+    if sa_url.drivername.startswith('sqlite'):
+      return  # SQLite's pools take no size
+    # binds all go through here without their name, so the replica is
+    # recognised by its URL
+    replica = (app.config.get('SQLALCHEMY_BINDS') or {}).get(REPLICA)
+    prefix = 'REPLICA' if replica and make_url(replica) == sa_url else 'DATABASE'
+    options.setdefault('pool_size', app.config[prefix + '_POOL_SIZE'])
+    options.setdefault('max_overflow', app.config[prefix + '_MAX_OVERFLOW'])
+    options.setdefault('pool_pre_ping', True)
+
+  def create_engine(self, sa_url, engine_opts):
+    engine = super(RoutingSQLAlchemy, self).create_engine(sa_url, engine_opts)
+    if engine.dialect.name == 'sqlite':
+      event.listen(engine, 'connect', _enable_foreign_keys)
+    return engine
+
+  def _pin_to_primary(self, response):
+    if g.get('db_wrote', False) and self.has_replica():
+      seconds = current_app.config['REPLICA_STICKY_SECONDS']
+      response.set_cookie(STICKY_COOKIE, '{:.3f}'.format(time.time() + seconds),
+                          max_age=int(math.ceil(seconds)), httponly=True, samesite='Lax')
+    return response
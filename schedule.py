@@ -0,0 +1,121 @@
+#----------------------------------------------------------------------------#
+# Double-booking checks for venue and artist schedules.
+#
+# A show occupies [start_time, start_time + duration minutes). No show is
+# longer than MAX_DURATION, so the only shows that can overlap a new one
+# start less than MAX_DURATION before it and before it ends: conflicts()
+# reads just that range off the (venue_id, start_time) and (artist_id,
+# start_time) indexes, O(log n) plus the shows in the range. On Postgres
+# the exclusion constraints of migration e81b5a0c93d4 refuse overlapping
+# shows as well, so two concurrent bookings cannot both get in.
+# batch_conflicts() checks many new shows with one query per schedule.
+#
+# sweep() finds every conflict already in the table with one ordered scan
+# of each schedule.
+#----------------------------------------------------------------------------#
+
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import timedelta
+
+from sqlalchemy import and_, select
+
+# minutes
+DEFAULT_DURATION = 120
+MAX_DURATION = 24 * 60
+
+SCHEDULES = ('venue_id', 'artist_id')
+
+
+def end_time(start_time, duration):
+  return start_time + timedelta(minutes=duration)
+
+
+def overlap_reason(clashes):
+  # e.g. 'overlaps another show of the venue and of the artist', for a set
+  # of schedules from conflicts() or batch_conflicts()
+  return 'overlaps another show of the {}'.format(
+    ' and of the '.join(key[:-len('_id')] for key in SCHEDULES if key in clashes))
+
+
+def conflicts(conn, show, venue_id, artist_id, start_time, duration):
+  # [(schedule, show row)] for the shows already at the venue or by the
+  # artist that overlap [start_time, start_time + duration)
+  end = end_time(start_time, duration)
+  found = []
+  for key, member_id in zip(SCHEDULES, (venue_id, artist_id)):
+    rows = conn.execute(select([
+      show.c.id, show.c.venue_id, show.c.artist_id, show.c.start_time, show.c.duration,
+    ]).where(and_(
+      show.c[key] == member_id,
+      show.c.start_time > start_time - timedelta(minutes=MAX_DURATION),
+      show.c.start_time < end,
+    )).order_by(show.c.start_time))
+    found += [(key, row) for row in rows if end_time(row.start_time, row.duration) > start_time]
+  return found
+
+
+def batch_conflicts(conn, show, rows):
+  # the conflicts() check for many new shows (dicts with venue_id,
+  # artist_id, start_time and duration) at once: one query per schedule
+  # reads the booked shows of every venue and artist in the batch over the
+  # batch's time span. Returns, for each row, the set of schedules it
+  # overlaps; rows are taken in order, so a row also clashes with an
+  # earlier row of the batch that was clear.
+  clashes = [set() for _ in rows]
+  if not rows:
+    return clashes
+  start = min(r['start_time'] for r in rows) - timedelta(minutes=MAX_DURATION)
+  end = max(end_time(r['start_time'], r['duration']) for r in rows)
+  booked = {}
+  for key in SCHEDULES:
+    # per member, (start, end) pairs in start order
+    booked[key] = defaultdict(list)
+    for member_id, start_time, duration in conn.execute(select([
+        show.c[key], show.c.start_time, show.c.duration,
+      ]).where(and_(
+        show.c[key].in_(set(r[key] for r in rows)),
+        show.c.start_time > start,
+        show.c.start_time < end,
+      )).order_by(show.c[key], show.c.start_time)):
+      booked[key][member_id].append((start_time, end_time(start_time, duration)))
+
+  for row, clash in zip(rows, clashes):
+    span = (row['start_time'], end_time(row['start_time'], row['duration']))
+    for key in SCHEDULES:
+      shows = booked[key][row[key]]
+      # only shows starting within MAX_DURATION before this one can reach it
+      i = bisect_left(shows, (span[0] - timedelta(minutes=MAX_DURATION),))
+      for other in shows[i:bisect_left(shows, (span[1],))]:
+        if other[1] > span[0]:
+          clash.add(key)
+          break
+    if not clash:
+      for key in SCHEDULES:
+        insort(booked[key][row[key]], span)
+  return clashes
+
+
+def sweep(conn, show, batch_size=1000):
+  # yields (schedule, member id, earlier show id, later show id) for every
+  # show that starts before an earlier show of the same venue or artist has
+  # ended, paired with the earlier show that ends last. Rows come in
+  # (member, start_time) order straight off the index, so each schedule is
+  # one pass keeping a single running end time.
+  for key in SCHEDULES:
+    column = show.c[key]
+    rows = conn.execution_options(stream_results=True).execute(select([
+      column, show.c.id, show.c.start_time, show.c.duration,
+    ]).order_by(column, show.c.start_time, show.c.id))
+    member = last_id = last_end = None
+    while True:
+      batch = rows.fetchmany(batch_size)
+      if not batch:
+        break
+      for member_id, id, start, duration in batch:
+        end = end_time(start, duration)
+        if member_id == member and start < last_end:
+          yield key, member_id, last_id, id
+          if end <= last_end:
+            continue
+        member, last_id, last_end = member_id, id, end
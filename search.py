@@ -0,0 +1,198 @@
+#----------------------------------------------------------------------------#
+# Name search for venues and artists.
+#
+# On Postgres the lookup is answered by the pg_trgm and tsvector GIN indexes
+# created in migration b974e2dbc6ec, ranked and paginated in one query that
+# also returns the total hit count and each hit's number of upcoming shows
+# (from the counters on the row, see counters.py). Other databases (SQLite
+# in development) use an in-process trigram index over (id, name) pairs
+# instead. search_async runs the same queries through an async driver for
+# the ASGI deployment (asgi.py).
+#----------------------------------------------------------------------------#
+
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import func, literal_column, or_
+
+
+def escape_like(term):
+  # makes % and _ in the user's term match literally inside ILIKE patterns,
+  # using Postgres' default backslash escape character
+  return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def trigrams(text):
+  return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+class TrigramIndex(object):
+  # case-insensitive substring index over (id, name) pairs. Terms of three
+  # or more characters are narrowed down through the trigram postings
+  # before the substring check; shorter terms check every name.
+
+  def __init__(self, rows):
+    self.names = {}
+    self.lowered = {}
+    self.postings = defaultdict(set)
+    for id, name in rows:
+      self.names[id] = name
+      self.lowered[id] = name.lower()
+      for gram in trigrams(self.lowered[id]):
+        self.postings[gram].add(id)
+
+  def candidates(self, term):
+    grams = trigrams(term)
+    if not grams:
+      return self.lowered.keys()
+    postings = sorted((self.postings.get(g, set()) for g in grams), key=len)
+    return set.intersection(*postings)
+
+  def search(self, term):
+    # returns matching ids, best match first: exact name, then prefix, then
+    # earlier match position, then alphabetical
+    term = term.lower()
+    hits = []
+    for id in self.candidates(term):
+      position = self.lowered[id].find(term)
+      if position >= 0:
+        hits.append((self.lowered[id] != term, position, self.lowered[id], id))
+    hits.sort()
+    return [hit[-1] for hit in hits]
+
+
+class SearchEngine(object):
+
+  def __init__(self, db, counters, ttl=60):
+    self.db = db
+    self.counters = counters
+    self.ttl = ttl
+    self._indexes = {}
+
+  def init_app(self, app):
+    self.ttl = app.config.get('SEARCH_INDEX_TTL', self.ttl)
+
+  def search(self, model, show_fk, term, limit=20, offset=0):
+    # show_fk is the Show column pointing at model, e.g. Show.venue_id.
+    # Returns {'count': total hits, 'data': [{'id', 'name', 'num_upcoming_shows'}]}
+    if self.db.session.get_bind().dialect.name == 'postgresql':
+      return self._search_postgres(model, show_fk, term, limit, offset)
+    return self._search_fallback(model, show_fk, term, limit, offset)
+
+  async def search_async(self, fetch, dialect, model, show_fk, term, limit=20, offset=0):
+    # the same search through an async driver: fetch(query) is a coroutine
+    # returning the rows of a Query, dialect the name of its database
+    if dialect == 'postgresql':
+      query, count_query = self._postgres_queries(model, show_fk, term, limit, offset)
+      rows = await fetch(query)
+      count = rows[0].total if rows else 0
+      if not rows and offset:
+        count = (await fetch(count_query))[0][0]
+      return self._results(count, rows)
+
+    index = self._cached_index(model)
+    if index is None:
+      index = self._build_index(model, await fetch(self._index_query(model)))
+    ids = index.search(term)
+    page = ids[offset:offset + limit]
+    upcoming = dict(await fetch(self._upcoming_query(model, show_fk, page))) if page else {}
+    return self._page(index, ids, page, upcoming)
+
+  def _upcoming(self, model, show_fk):
+    # the stored upcoming count, less the shows that started since the
+    # counters were last rolled, and the subquery to outer join for it
+    moved = self.counters.moved(show_fk.key, datetime.now())
+    upcoming = model.upcoming_shows_count - func.coalesce(moved.c.moved, 0)
+    return upcoming.label('num_upcoming_shows'), moved
+
+  def invalidate(self, model):
+    # called by the write handlers so the fallback index picks up changes
+    self._indexes.pop(model, None)
+
+  def _postgres_queries(self, model, show_fk, term, limit, offset):
+    # the ranked page of hits, and the count of all hits for when the page
+    # comes back empty. The configuration is inlined so the planner can
+    # match the expression index.
+    config = literal_column("'simple'")
+    document = func.to_tsvector(config, model.name)
+    query = func.plainto_tsquery(config, term)
+    matches = or_(
+      model.name.ilike('%{}%'.format(escape_like(term))),
+      document.op('@@')(query),
+    )
+    rank = func.ts_rank(document, query) + func.similarity(model.name, term)
+    upcoming, moved = self._upcoming(model, show_fk)
+    page = self.db.session.query(
+      model.id, model.name, upcoming,
+      func.count().over().label('total'),
+    ).outerjoin(
+      moved, moved.c.member_id == model.id
+    ).filter(matches).order_by(
+      rank.desc(), model.name, model.id
+    ).limit(limit).offset(offset)
+    return page, self.db.session.query(func.count(model.id)).filter(matches)
+
+  def _search_postgres(self, model, show_fk, term, limit, offset):
+    query, count_query = self._postgres_queries(model, show_fk, term, limit, offset)
+    rows = query.all()
+    if rows:
+      count = rows[0].total
+    elif offset:
+      # paged past the end; the window count is only known when rows come back
+      count = count_query.scalar()
+    else:
+      count = 0
+    return self._results(count, rows)
+
+  def _results(self, count, rows):
+    return {
+      'count': count,
+      'data': [{
+        'id': r.id,
+        'name': r.name,
+        'num_upcoming_shows': r.num_upcoming_shows,
+      } for r in rows],
+    }
+
+  def _search_fallback(self, model, show_fk, term, limit, offset):
+    index = self._cached_index(model)
+    if index is None:
+      index = self._build_index(model, self._index_query(model).all())
+    ids = index.search(term)
+    page = ids[offset:offset + limit]
+    upcoming = dict(self._upcoming_query(model, show_fk, page).all()) if page else {}
+    return self._page(index, ids, page, upcoming)
+
+  def _upcoming_query(self, model, show_fk, ids):
+    num_upcoming, moved = self._upcoming(model, show_fk)
+    return self.db.session.query(
+      model.id, num_upcoming
+    ).outerjoin(
+      moved, moved.c.member_id == model.id
+    ).filter(model.id.in_(ids))
+
+  def _page(self, index, ids, page, upcoming):
+    return {
+      'count': len(ids),
+      'data': [{
+        'id': id,
+        'name': index.names[id],
+        'num_upcoming_shows': upcoming.get(id, 0),
+      } for id in page],
+    }
+
+  def _index_query(self, model):
+    return self.db.session.query(model.id, model.name)
+
+  def _cached_index(self, model):
+    # the fallback index for model, or None when it is missing or stale
+    built_at, index = self._indexes.get(model, (0, None))
+    if index is None or time.time() - built_at > self.ttl:
+      return None
+    return index
+
+  def _build_index(self, model, rows):
+    index = TrigramIndex(rows)
+    self._indexes[model] = (time.time(), index)
+    return index
@@ -0,0 +1,153 @@
+#----------------------------------------------------------------------------#
+# Synthetic data for load testing.
+#
+# Generates venues, artists and shows from a fixed random seed, so the same
+# arguments always produce the same dataset, and writes them with chunked
+# executemany inserts instead of one ORM object per row. The show counters
+# are recomputed once at the end.
+#----------------------------------------------------------------------------#
+
+import random
+from datetime import datetime, timedelta
+
+from counters import ShowCounters
+from importer import chunked
+from schedule import DEFAULT_DURATION
+
+CHUNK_SIZE = 10000
+# draws per show before the venues and artists are taken to be booked up
+MAX_ATTEMPTS = 1000
+
+CITIES = [
+  ('San Francisco', 'CA'), ('Los Angeles', 'CA'), ('New York', 'NY'),
+  ('Brooklyn', 'NY'), ('Austin', 'TX'), ('Houston', 'TX'), ('Chicago', 'IL'),
+  ('Seattle', 'WA'), ('Portland', 'OR'), ('Nashville', 'TN'),
+  ('New Orleans', 'LA'), ('Denver', 'CO'), ('Atlanta', 'GA'), ('Boston', 'MA'),
+  ('Miami', 'FL'), ('Detroit', 'MI'), ('Minneapolis', 'MN'),
+  ('Philadelphia', 'PA'), ('Phoenix', 'AZ'), ('Washington', 'DC'),
+]
+
+GENRES = [
+  'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+  'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+  'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul',
+  'Other',
+]
+
+WORDS = [
+  'Musical', 'Hop', 'Park', 'Square', 'Live', 'Coffee', 'Dueling', 'Pianos',
+  'Wild', 'Sax', 'Band', 'Guns', 'Petals', 'Blue', 'Note', 'Velvet', 'Room',
+  'Electric', 'Garden', 'Sound', 'House', 'Echo', 'Lounge', 'Stage', 'Cellar',
+  'Midnight', 'Riot', 'Golden', 'Fox', 'Crow', 'River', 'Static', 'Neon',
+]
+
+
+class SeedError(Exception):
+  pass
+
+
+def name(rng, i):
+  return '{} {} {}'.format(rng.choice(WORDS), rng.choice(WORDS), i)
+
+
+def venue_rows(rng, count):
+  for i in range(count):
+    city, state = rng.choice(CITIES)
+    yield {
+      'name': name(rng, i), 'city': city, 'state': state,
+      'address': '{} {} St'.format(rng.randint(1, 9999), rng.choice(WORDS)),
+      'phone': '{:03d}-{:03d}-{:04d}'.format(rng.randint(200, 999), rng.randint(0, 999), rng.randint(0, 9999)),
+      'image_link': None, 'facebook_link': None, 'website_link': None,
+      'seeking_talent': rng.random() < 0.3, 'seeking_description': None,
+    }
+
+
+def artist_rows(rng, count):
+  for i in range(count):
+    city, state = rng.choice(CITIES)
+    yield {
+      'name': name(rng, i), 'city': city, 'state': state,
+      'phone': '{:03d}-{:03d}-{:04d}'.format(rng.randint(200, 999), rng.randint(0, 999), rng.randint(0, 9999)),
+      'image_link': None, 'facebook_link': None, 'website_link': None,
+      'seeking_venue': rng.random() < 0.3, 'seeking_description': None,
+    }
+
+
+def show_rows(rng, count, venue_ids, artist_ids, now):
+  # start times spread over two years either side of now, on the hour. A
+  # draw that would overlap an earlier show of its venue or artist is
+  # drawn again, so the data passes the Postgres exclusion constraints;
+  # SeedError when no free slot turns up in MAX_ATTEMPTS draws.
+  hours = -(-DEFAULT_DURATION // 60)
+  booked = set()
+  for n in range(count):
+    for _ in range(MAX_ATTEMPTS):
+      venue_id, artist_id = rng.choice(venue_ids), rng.choice(artist_ids)
+      hour = rng.randint(-24 * 730, 24 * 730)
+      slots = [(key, hour + i) for key in (('venue', venue_id), ('artist', artist_id))
+               for i in range(-hours + 1, hours)]
+      if booked.isdisjoint(slots):
+        break
+    else:
+      raise SeedError('{} venues and {} artists are booked up after {} of {} shows; '
+                      'ask for fewer shows or more venues and artists'.format(
+                        len(venue_ids), len(artist_ids), n, count))
+    booked.add((('venue', venue_id), hour))
+    booked.add((('artist', artist_id), hour))
+    yield {
+      'venue_id': venue_id,
+      'artist_id': artist_id,
+      'start_time': now + timedelta(hours=hour),
+      'duration': DEFAULT_DURATION,
+    }
+
+
+def genre_rows(rng, member_key, ids, genre_ids):
+  for id in ids:
+    for genre_id in rng.sample(genre_ids, rng.randint(1, 3)):
+      yield {member_key: id, 'genre_id': genre_id}
+
+
+def insert(conn, table, rows):
+  total = 0
+  for chunk in chunked(rows, CHUNK_SIZE):
+    conn.execute(table.insert(), chunk)
+    total += len(chunk)
+  return total
+
+
+def seed_database(engine, tables, venues, artists, shows, random_seed=0, reset=False):
+  # tables maps 'Venue', 'Artist', 'Show', 'Genre', 'VenueGenre' and
+  # 'ArtistGenre' to their Table objects. Returns the row counts written.
+  rng = random.Random(random_seed)
+  # a fixed reference time keeps the dataset identical between runs
+  now = datetime(2026, 1, 1, 20, 0)
+  written = {}
+  with engine.begin() as conn:
+    if reset:
+      for table_name in ('Show', 'VenueGenre', 'ArtistGenre', 'Venue', 'Artist', 'Genre'):
+        conn.execute(tables[table_name].delete())
+
+    genre = tables['Genre']
+    existing = set(n for n, in conn.execute(genre.select().with_only_columns([genre.c.name])))
+    insert(conn, genre, ({'name': n} for n in GENRES if n not in existing))
+    genre_ids = sorted(id for id, in conn.execute(genre.select().with_only_columns([genre.c.id])))
+
+    for table_name, rows, count, key in (
+        ('Venue', venue_rows, venues, 'venue_id'),
+        ('Artist', artist_rows, artists, 'artist_id')):
+      table = tables[table_name]
+      before = conn.execute(table.select().with_only_columns([table.c.id]).order_by(table.c.id.desc()).limit(1)).scalar() or 0
+      written[table_name] = insert(conn, table, rows(rng, count))
+      ids = [id for id, in conn.execute(
+        table.select().with_only_columns([table.c.id]).where(table.c.id > before).order_by(table.c.id))]
+      written[table_name + 'Genre'] = insert(conn, tables[table_name + 'Genre'], genre_rows(rng, key, ids, genre_ids))
+
+    venue = tables['Venue']
+    artist = tables['Artist']
+    venue_ids = [id for id, in conn.execute(venue.select().with_only_columns([venue.c.id]).order_by(venue.c.id))]
+    artist_ids = [id for id, in conn.execute(artist.select().with_only_columns([artist.c.id]).order_by(artist.c.id))]
+    if shows and venue_ids and artist_ids:
+      written['Show'] = insert(conn, tables['Show'], show_rows(rng, shows, venue_ids, artist_ids, now))
+    ShowCounters(tables).repair(conn)
+  return written
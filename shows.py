@@ -0,0 +1,306 @@
+#----------------------------------------------------------------------------#
+# Shows blueprint: the show listing and calendar, and scheduling shows one
+# at a time or in batches.
+#----------------------------------------------------------------------------#
+
+import traceback
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from flask import Blueprint, abort, current_app, flash, g, jsonify, render_template, request, url_for
+from sqlalchemy import or_
+
+from extensions import db, page_cache, show_counters
+from helpers import conditional, decode_cursor, encode_cursor, parse_date_arg, stream_template, table_validators
+from models import Artist, Show, Venue
+from routing import read_only
+from schedule import DEFAULT_DURATION, batch_conflicts, conflicts, overlap_reason
+
+bp = Blueprint('shows', __name__)
+
+#----------------------------------------------------------------------------#
+# Page data.
+#----------------------------------------------------------------------------#
+
+def shows_query(past, after, per_page):
+  # upcoming shows soonest first, or past shows most recent first, one page
+  # (and one row to tell whether there is another) at a time. after is the
+  # (start_time, id) of the last show on the previous page, so every page is
+  # an index range scan.
+  query = db.session.query(
+    Show.id, Show.start_time,
+    Show.venue_id, Venue.name.label('venue_name'),
+    Show.artist_id, Artist.name.label('artist_name'),
+    Artist.image_link.label('artist_image_link'),
+  ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id)
+
+  if past:
+    query = query.filter(Show.start_time < datetime.now())
+    if after:
+      query = query.filter(Show.start_time <= after[0], or_(
+        Show.start_time < after[0], Show.id < after[1]))
+    query = query.order_by(Show.start_time.desc(), Show.id.desc())
+  else:
+    query = query.filter(Show.start_time >= datetime.now())
+    if after:
+      query = query.filter(Show.start_time >= after[0], or_(
+        Show.start_time > after[0], Show.id > after[1]))
+    query = query.order_by(Show.start_time, Show.id)
+  return query.limit(per_page + 1)
+
+def shows_from_rows(rows, per_page):
+  data = []
+  for q in rows[:per_page]:
+    show_dict = {}
+    show_dict['venue_id'] = q.venue_id
+    show_dict['venue_name'] = q.venue_name
+    show_dict['artist_id'] = q.artist_id
+    show_dict['artist_name'] = q.artist_name
+    show_dict['artist_image_link'] = q.artist_image_link
+    show_dict['start_time'] = q.start_time
+    data.append(show_dict)
+
+  next_cursor = None
+  if len(rows) > per_page:
+    last = rows[per_page - 1]
+    next_cursor = encode_cursor(last.start_time, last.id)
+
+  return data, next_cursor
+
+def shows_data(past, after):
+  per_page = current_app.config['SHOWS_PAGE_SIZE']
+  return shows_from_rows(shows_query(past, after, per_page).all(), per_page)
+
+def calendar_data(start, end, city, state, after):
+  # shows starting in [start, end), at venues in city and state when given,
+  # grouped by day and paged like shows_data. The range comes off
+  # ix_Show_start_time with each venue joined by primary key; when city or
+  # state is narrow the planner can start from ix_Venue_state_city and scan
+  # ix_Show_venue_id_start_time per venue instead.
+  query = db.session.query(
+    Show.id, Show.start_time,
+    Show.venue_id, Venue.name.label('venue_name'), Venue.city, Venue.state,
+    Show.artist_id, Artist.name.label('artist_name'),
+    Artist.image_link.label('artist_image_link'),
+  ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id
+  ).filter(Show.start_time >= start, Show.start_time < end)
+  if city:
+    query = query.filter(Venue.city == city)
+  if state:
+    query = query.filter(Venue.state == state)
+  if after:
+    query = query.filter(Show.start_time >= after[0], or_(
+      Show.start_time > after[0], Show.id > after[1]))
+
+  per_page = current_app.config['CALENDAR_PAGE_SIZE']
+  rows = query.order_by(Show.start_time, Show.id).limit(per_page + 1).all()
+  days = []
+  for day, group in groupby(rows[:per_page], key=lambda q: q.start_time.date()):
+    days.append({
+      'date': day,
+      'shows': [{
+        'id': q.id,
+        'start_time': q.start_time,
+        'venue_id': q.venue_id,
+        'venue_name': q.venue_name,
+        'city': q.city,
+        'state': q.state,
+        'artist_id': q.artist_id,
+        'artist_name': q.artist_name,
+        'artist_image_link': q.artist_image_link,
+      } for q in group],
+    })
+
+  next_cursor = None
+  if len(rows) > per_page:
+    last = rows[per_page - 1]
+    next_cursor = encode_cursor(last.start_time, last.id)
+
+  return days, next_cursor
+
+#----------------------------------------------------------------------------#
+# Validators.
+#----------------------------------------------------------------------------#
+
+def shows_validators():
+  return table_validators(Show, Venue, Artist, shows_start=True)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@bp.route('/shows')
+@read_only
+@conditional(shows_validators)
+def shows():
+  # displays list of shows at /shows
+  past = request.args.get('past', 0, type=int) == 1
+  cursor = request.args.get('after')
+  after = decode_cursor(cursor)
+  key = page_cache.namespace('shows') + '{}:{}'.format(int(past), cursor or '')
+  data, next_cursor = page_cache.get_or_build(key, lambda: shows_data(past, after), g.get('etag'))
+  return stream_template('pages/shows.html', shows=data, past=past, next_cursor=next_cursor)
+
+def calendar_args():
+  # from defaults to the start of today and to a week later; a date-only to
+  # includes that whole day. Ranges longer than CALENDAR_MAX_DAYS are refused.
+  start = parse_date_arg('from') or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+  end = parse_date_arg('to')
+  if end is None:
+    end = start + timedelta(days=7)
+  elif len(request.args['to']) == len('YYYY-MM-DD'):
+    end += timedelta(days=1)
+  if end <= start or end - start > timedelta(days=current_app.config['CALENDAR_MAX_DAYS']):
+    abort(400)
+  return start, end, request.args.get('city', ''), request.args.get('state', '')
+
+def calendar_page():
+  start, end, city, state = calendar_args()
+  cursor = request.args.get('after')
+  after = decode_cursor(cursor)
+  key = page_cache.namespace('shows') + 'calendar:{}:{}:{}:{}:{}'.format(
+    start.isoformat(), end.isoformat(), city, state, cursor or '')
+  days, next_cursor = page_cache.get_or_build(key, lambda: calendar_data(start, end, city, state, after), g.get('etag'))
+  return {
+    'from': start.isoformat(),
+    'to': end.isoformat(),
+    'city': city,
+    'state': state,
+    'days': days,
+    'next_cursor': next_cursor,
+  }
+
+@bp.route('/shows/calendar')
+@read_only
+@conditional(shows_validators)
+def shows_calendar():
+  # shows between ?from= and ?to=, optionally in ?city= and ?state=, by day
+  calendar = calendar_page()
+  next_url = None
+  if calendar['next_cursor']:
+    next_url = url_for('.shows_calendar', **dict(request.args.items(), after=calendar['next_cursor']))
+  return render_template('pages/calendar.html', calendar=calendar, next_url=next_url)
+
+@bp.route('/shows/calendar.json')
+@read_only
+@conditional(shows_validators)
+def shows_calendar_json():
+  calendar = calendar_page()
+  calendar['days'] = [{
+    'date': day['date'].isoformat(),
+    'shows': [dict(show, start_time=show['start_time'].isoformat()) for show in day['shows']],
+  } for day in calendar['days']]
+  return jsonify(calendar)
+
+@bp.route('/shows/create')
+def create_shows():
+  # renders form. do not touch.
+  from forms import ShowForm
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  # called to create new shows in the db, upon submitting new show listing form
+  # TODO: insert form data as a new Show record in the db, instead
+  
+  import dateutil.parser
+  try:
+    artist_id = int(request.form['artist_id'])
+    venue_id = int(request.form['venue_id'])
+    start_time = dateutil.parser.parse(request.form['start_time'])
+    duration = int(request.form.get('duration') or DEFAULT_DURATION)
+    clashes = set(key for key, _ in conflicts(
+      db.session.connection(), Show.__table__, venue_id, artist_id, start_time, duration))
+    if clashes:
+      flash('Show could not be listed: it {}!'.format(overlap_reason(clashes)))
+      return render_template('pages/home.html')
+    show = Show(artist_id = artist_id, venue_id = venue_id, start_time = start_time, duration = duration)
+    db.session.add(show)
+    show_counters.record(db.session.connection(), [
+      {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time}])
+    db.session.commit()
+    page_cache.invalidate('venue:{}'.format(venue_id), 'artist:{}'.format(artist_id))
+    page_cache.invalidate_namespace('venues')
+    page_cache.invalidate_namespace('shows')
+    flash('Show was successfully listed!')
+  except:
+    db.session.rollback()
+    flash('Show could not be successfully listed!')
+  finally:
+    db.session.close()
+  # on successful db insert, flash success
+  #flash('Show was successfully listed!')
+  # TODO: on unsuccessful db insert, flash an error instead.
+  # e.g., flash('An error occurred. Show could not be listed.')
+  # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+  return render_template('pages/home.html')
+
+@bp.route('/shows/batch', methods=['POST'])
+def create_shows_batch():
+  # schedules many shows at once from {"shows": [{"venue_id", "artist_id",
+  # "start_time", "duration"}, ...]}; venue_name and artist_name may stand
+  # in for the ids, as in `flask import`. Rows that are invalid, refer to
+  # unknown venues or artists, or overlap a booked show are reported and
+  # left out; the rest are inserted in one transaction.
+  from importer import Importer, Reject, apply_defaults, clean
+  payload = request.get_json(silent=True)
+  records = payload.get('shows') if isinstance(payload, dict) else None
+  if not isinstance(records, list):
+    return jsonify({'success': False, 'error': 'expected {"shows": [...]}'}), 400
+  if len(records) > current_app.config['SHOWS_BATCH_MAX']:
+    return jsonify({'success': False, 'error': 'at most {} shows per batch'.format(current_app.config['SHOWS_BATCH_MAX'])}), 413
+
+  results = [{'index': i, 'status': 'created'} for i in range(len(records))]
+  def reject(index, reason):
+    results[index].update(status='rejected', error=reason)
+
+  rows = []
+  for i, record in enumerate(records):
+    try:
+      if not isinstance(record, dict):
+        raise Reject('not an object')
+      rows.append((i, record) + clean('shows', record))
+    except Reject as e:
+      reject(i, str(e))
+
+  table = Show.__table__
+  try:
+    conn = db.session.connection()
+    # one IN query per referenced table for the whole batch
+    values, refused = Importer(db.engine, db.metadata.tables).resolve_references(conn, rows)
+    for i, _, reason in refused:
+      reject(i, reason)
+    indexes = [i for i, _, _, _ in rows if results[i]['status'] == 'created']
+    values = apply_defaults(table, values)
+    for i, row, clashes in zip(indexes, values, batch_conflicts(conn, table, values)):
+      if clashes:
+        reject(i, overlap_reason(clashes))
+    values = [row for i, row in zip(indexes, values) if results[i]['status'] == 'created']
+    if values:
+      conn.execute(table.insert(), values)
+      show_counters.record(conn, values)
+    db.session.commit()
+  except:
+    db.session.rollback()
+    traceback.print_exc()
+    return jsonify({'success': False, 'error': 'the batch could not be scheduled'}), 500
+  finally:
+    db.session.close()
+
+  keys = set()
+  for row in values:
+    keys.update(['venue:{}'.format(row['venue_id']), 'artist:{}'.format(row['artist_id'])])
+  if keys:
+    page_cache.invalidate(*keys)
+    page_cache.invalidate_namespace('venues')
+    page_cache.invalidate_namespace('shows')
+  return jsonify({
+    'success': True,
+    'created': len(values),
+    'rejected': len(records) - len(values),
+    'results': results,
+  })
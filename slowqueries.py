@@ -0,0 +1,132 @@
+#----------------------------------------------------------------------------#
+# Slow-query log.
+#
+# Off unless SLOW_QUERY_MS is set. Engine events time every statement, and
+# one that takes longer is logged as a warning with its parameters (for an
+# executemany, the row count and first row) and the route, view function
+# and URL of the request that issued it. On Postgres
+# a SELECT's plan is captured too, with EXPLAIN (ANALYZE, BUFFERS) run on a
+# connection of its own in a background thread. ANALYZE runs the query
+# again, so at most one plan is captured per SLOW_QUERY_EXPLAIN_INTERVAL;
+# slow statements in between are logged without one. A SELECT that locks
+# rows or calls a function with side effects is only planned, with plain
+# EXPLAIN, never run again.
+#----------------------------------------------------------------------------#
+
+import re
+import threading
+import time
+
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# row locks, and functions that write, wait or act outside the database
+SIDE_EFFECTS = re.compile(
+  r'\bFOR\s+(NO\s+KEY\s+)?UPDATE\b|\bFOR\s+(KEY\s+)?SHARE\b'
+  r'|\b(nextval|setval|pg_(try_)?advisory\w*|pg_notify|pg_sleep\w*|lo_\w+|dblink\w*)\s*\(',
+  re.IGNORECASE)
+
+
+def is_select(statement):
+  # only reads are explained
+  return statement.lstrip().upper().startswith('SELECT')
+
+
+def explain_prefix(statement):
+  # ANALYZE executes the statement, so a read with side effects is
+  # planned without it
+  if SIDE_EFFECTS.search(statement):
+    return 'EXPLAIN '
+  return 'EXPLAIN (ANALYZE, BUFFERS) '
+
+
+def summarize(parameters, executemany):
+  # a bulk insert can carry thousands of rows; one shows their shape
+  if not executemany:
+    return parameters
+  return {'rows': len(parameters), 'first': parameters[0] if parameters else None}
+
+
+class SlowQueryLog(object):
+
+  def __init__(self, app=None):
+    self.threshold = None
+    self.logged = 0
+    self.explained = 0
+    self._next_explain = 0.0
+    self._lock = threading.Lock()
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    if not app.config['SLOW_QUERY_MS']:
+      self.threshold = None
+      return
+    self.threshold = app.config['SLOW_QUERY_MS'] / 1000.0
+    self.interval = app.config['SLOW_QUERY_EXPLAIN_INTERVAL']
+    self.logger = app.logger
+    # once, however many apps are created (see RequestMetrics.init_app)
+    if not event.contains(Engine, 'before_cursor_execute', self._before_cursor_execute):
+      event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+      event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+  def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+
+  def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['slow_query_start'].pop()
+    # None once an app without SLOW_QUERY_MS has been created since
+    if self.threshold is None or elapsed < self.threshold:
+      return
+    record = {
+      'duration_ms': round(elapsed * 1000, 3),
+      'statement': ' '.join(statement.split()),
+      'parameters': summarize(parameters, executemany),
+      'route': None,
+      'view': None,
+      'url': None,
+    }
+    if has_request_context() and request.url_rule is not None:
+      view = current_app.view_functions.get(request.url_rule.endpoint)
+      record['route'] = request.url_rule.endpoint
+      record['view'] = getattr(view, '__name__', None)
+      record['url'] = '{} {}'.format(request.method, request.full_path.rstrip('?'))
+    if conn.dialect.name == 'postgresql' and not executemany and is_select(statement) \
+        and self._may_explain():
+      threading.Thread(target=self._explain, args=(conn.engine, statement, parameters, record),
+                       daemon=True).start()
+    else:
+      self._log(record)
+
+  def _may_explain(self):
+    if not self.interval:
+      return False
+    with self._lock:
+      now = time.monotonic()
+      if now < self._next_explain:
+        return False
+      self._next_explain = now + self.interval
+      return True
+
+  def _explain(self, engine, statement, parameters, record):
+    # on a raw DBAPI connection, so neither these events nor the request
+    # metrics see the EXPLAIN; the parameters are already in its format
+    connection = engine.raw_connection()
+    try:
+      cursor = connection.cursor()
+      cursor.execute(explain_prefix(statement) + statement, parameters)
+      record['plan'] = '\n'.join(row[0] for row in cursor.fetchall())
+      self.explained += 1
+    except Exception as e:
+      record['plan_error'] = str(e)
+    finally:
+      connection.rollback()
+      connection.close()
+    self._log(record)
+
+  def _log(self, record):
+    self.logged += 1
+    self.logger.warning('slow query %.1fms route=%s: %s', record['duration_ms'], record['route'],
+                        record['statement'], extra={'query': record})
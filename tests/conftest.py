@@ -0,0 +1,98 @@
+#----------------------------------------------------------------------------#
+# Fixtures: an app on a fresh SQLite database per test, seeded on request.
+#----------------------------------------------------------------------------#
+
+import pytest
+from sqlalchemy import event
+
+import config
+from app import create_app
+from extensions import db
+
+
+def make_config(**overrides):
+  # config.py's settings, with the test database and any overrides
+  settings = dict((k, getattr(config, k)) for k in dir(config) if k.isupper())
+  settings.update(
+    TESTING=True,
+    DEBUG=True,
+    WTF_CSRF_ENABLED=False,
+    SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    SQLALCHEMY_BINDS={},
+  )
+  settings.update(overrides)
+  return type('TestConfig', (object,), settings)
+
+
+@pytest.fixture
+def make_app(tmp_path):
+  # make_app(**config overrides) -> an app whose tables exist, on its own
+  # SQLite file under tmp_path unless SQLALCHEMY_DATABASE_URI is given
+  apps = []
+
+  def make(**overrides):
+    overrides.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///{}'.format(tmp_path / 'fyyur.db'))
+    app = create_app(make_config(**overrides))
+    with app.app_context():
+      db.create_all()
+    apps.append(app)
+    return app
+  yield make
+  for app in apps:
+    with app.app_context():
+      db.session.remove()
+      for _, engine in db.engines(app):
+        engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+  return make_app()
+
+
+@pytest.fixture
+def client(app):
+  return app.test_client()
+
+
+@pytest.fixture
+def seed(app):
+  # seed(venues, artists, shows) fills the database as `flask seed` does
+  from seed import seed_database
+
+  def fill(venues=5, artists=5, shows=50, random_seed=0):
+    with app.app_context():
+      tables = dict((t.name, t) for t in db.metadata.sorted_tables)
+      return seed_database(db.engine, tables, venues, artists, shows, random_seed)
+  return fill
+
+
+@pytest.fixture
+def backdate(app):
+  # backdate(when) sets every updated_at, and the time of every deletion so
+  # far, to when, so that pages carry a Last-Modified; models=() leaves the
+  # rows alone
+  from models import Artist, DeletionCounter, Show, Venue
+
+  def set_times(when, models=(Venue, Artist, Show)):
+    with app.app_context():
+      for model in models:
+        db.session.query(model).update({model.updated_at: when}, synchronize_session=False)
+      db.session.query(DeletionCounter).filter(DeletionCounter.deleted_at.isnot(None)).update(
+        {DeletionCounter.deleted_at: when}, synchronize_session=False)
+      db.session.commit()
+  return set_times
+
+
+@pytest.fixture
+def statements(app):
+  # the SQL statements the app issues, in order; clear it between requests
+  issued = []
+
+  def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    issued.append(statement)
+  with app.app_context():
+    engine = db.engine
+  event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+  yield issued
+  event.remove(engine, 'before_cursor_execute', before_cursor_execute)
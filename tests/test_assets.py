@@ -0,0 +1,34 @@
+#----------------------------------------------------------------------------#
+# Built assets: fingerprinted files are cached for good, the manifest that
+# names them is revalidated.
+#----------------------------------------------------------------------------#
+
+import os
+
+from assets import MANIFEST, OUTPUT, build
+from extensions import assets
+
+
+def test_only_fingerprinted_files_are_immutable(client, tmp_path, monkeypatch):
+  static = tmp_path / 'static'
+  static.mkdir()
+  (static / 'site.css').write_text('body {\n  color: #333;\n}\n')
+  manifest = build(str(static), {'site.css': ['site.css']})
+  # served from the build above rather than the app's static/dist/; assets
+  # is shared by every app the tests create, so both are put back after
+  monkeypatch.setattr(assets, 'output', os.path.join(str(static), OUTPUT))
+  monkeypatch.setattr(assets, 'manifest', assets.manifest)
+  assets.load()
+
+  response = client.get('/static/dist/' + manifest['site.css'], headers={'Accept-Encoding': 'gzip'})
+  assert response.status_code == 200
+  assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+  assert response.headers['Content-Encoding'] == 'gzip'
+  response.close()
+
+  response = client.get('/static/dist/' + MANIFEST)
+  assert response.status_code == 200
+  assert response.headers['Cache-Control'] == 'no-cache'
+  etag = response.headers['ETag']
+  response.close()
+  assert client.get('/static/dist/' + MANIFEST, headers={'If-None-Match': etag}).status_code == 304
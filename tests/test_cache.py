@@ -0,0 +1,25 @@
+#----------------------------------------------------------------------------#
+# DataCache: entries are served only to requests for the version they were
+# built for.
+#----------------------------------------------------------------------------#
+
+from cache import DataCache, LRUCache, MISSING
+
+
+def test_entry_is_served_for_its_version():
+  cache = DataCache(LRUCache())
+  assert cache.get_or_build('venue:1', lambda: 'old', 'etag-1') == 'old'
+  assert cache.get_or_build('venue:1', lambda: 'new', 'etag-1') == 'old'
+  assert cache.get_or_build('venue:1', lambda: 'new', 'etag-2') == 'new'
+
+
+def test_no_version_builds_fresh():
+  # a page with a flash message has no ETag to check the entry against
+  cache = DataCache(LRUCache())
+  cache.get_or_build('venue:1', lambda: 'stale', 'etag-1')
+  assert cache.get_or_build('venue:1', lambda: 'fresh') == 'fresh'
+  assert cache.backend.get('venue:1') == ('etag-1', 'stale')
+
+  cache.backend.clear()
+  cache.get_or_build('venue:1', lambda: 'fresh')
+  assert cache.backend.get('venue:1') is MISSING
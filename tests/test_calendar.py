@@ -0,0 +1,85 @@
+#----------------------------------------------------------------------------#
+# /shows/calendar and its JSON twin: shows in a date range, by day.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+
+import pytest
+
+from extensions import db
+from models import Show, Venue
+
+TIMES = ['2030-02-28T23:59:00', '2030-03-01T00:00:00', '2030-03-01T20:00:00',
+         '2030-03-03T23:30:00', '2030-03-04T00:00:00']
+
+
+@pytest.fixture
+def calendar(make_app):
+  app = make_app(CALENDAR_PAGE_SIZE=2)
+  with app.app_context():
+    from seed import seed_database
+    seed_database(db.engine, dict((t.name, t) for t in db.metadata.sorted_tables), 2, 1, 0)
+    # a show at each time, alternating between the two venues
+    db.session.add_all(Show(venue_id=i % 2 + 1, artist_id=1, start_time=datetime.fromisoformat(t))
+                       for i, t in enumerate(TIMES))
+    db.session.commit()
+  return app
+
+
+def pages(client, query):
+  # the start times on every page of the JSON calendar, by day
+  days = {}
+  while True:
+    response = client.get('/shows/calendar.json?' + query)
+    assert response.status_code == 200
+    calendar = response.get_json()
+    for day in calendar['days']:
+      days.setdefault(day['date'], []).extend(s['start_time'] for s in day['shows'])
+    if not calendar['next_cursor']:
+      return days
+    query = query.split('&after=')[0] + '&after=' + calendar['next_cursor']
+
+
+def test_date_only_range_includes_the_last_day(calendar):
+  client = calendar.test_client()
+  assert pages(client, 'from=2030-03-01&to=2030-03-03') == {
+    '2030-03-01': ['2030-03-01T00:00:00', '2030-03-01T20:00:00'],
+    '2030-03-03': ['2030-03-03T23:30:00'],
+  }
+  calendar_json = client.get('/shows/calendar.json?from=2030-03-01&to=2030-03-03').get_json()
+  assert (calendar_json['from'], calendar_json['to']) == ('2030-03-01T00:00:00', '2030-03-04T00:00:00')
+
+
+def test_time_bound_is_exclusive(calendar):
+  client = calendar.test_client()
+  assert pages(client, 'from=2030-02-28T23:59:00&to=2030-03-01T20:00:00') == {
+    '2030-02-28': ['2030-02-28T23:59:00'],
+    '2030-03-01': ['2030-03-01T00:00:00'],
+  }
+
+
+def test_city_filter_and_html_twin(calendar):
+  client = calendar.test_client()
+  with calendar.app_context():
+    venue = Venue.query.get(2)
+    city, state = venue.city, venue.state
+  query = 'from=2030-02-01&to=2030-03-03&city={}&state={}'.format(city, state)
+  assert pages(client, query) == {'2030-03-01': ['2030-03-01T00:00:00'], '2030-03-03': ['2030-03-03T23:30:00']}
+
+  page = client.get('/shows/calendar?' + query).get_data(as_text=True)
+  assert page.count('class="tile tile-show"') == 2
+  assert 'No shows in this range.' not in client.get('/shows/calendar?from=2030-03-01').get_data(as_text=True)
+  assert 'No shows in this range.' in client.get('/shows/calendar?from=2031-01-01').get_data(as_text=True)
+
+
+@pytest.mark.parametrize('query', [
+  'from=2030-03-02&to=2030-03-01',
+  'from=2030-03-01T10:00:00&to=2030-03-01T10:00:00',
+  'from=2030-01-01&to=2030-03-01',
+  'from=March',
+  'after=nonsense',
+])
+def test_bad_ranges_are_refused(calendar, query):
+  client = calendar.test_client()
+  assert client.get('/shows/calendar?' + query).status_code == 400
+  assert client.get('/shows/calendar.json?' + query).status_code == 400
@@ -0,0 +1,95 @@
+#----------------------------------------------------------------------------#
+# The upcoming/past show counters on venues and artists stay exact through
+# every write path and as shows move past the watermark.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db, show_counters
+from models import Artist, Show, ShowCounterWatermark, Venue
+from venues import venues_data
+
+
+@pytest.fixture
+def counted(make_app):
+  # writes never roll the watermark themselves, so the test moves it
+  app = make_app(COUNTERS_ROLL_INTERVAL=86400)
+  with app.app_context():
+    from seed import seed_database
+    seed_database(db.engine, dict((t.name, t) for t in db.metadata.sorted_tables), 3, 3, 30)
+  return app
+
+
+def verify(app):
+  result = app.test_cli_runner().invoke(args=['counters', 'verify'])
+  assert (result.exit_code, result.output) == (0, 'No drift.\n')
+
+
+def counts(app, model, id):
+  with app.app_context():
+    member = model.query.get(id)
+    return member.upcoming_shows_count, member.past_shows_count
+
+
+def test_counts_follow_writes(counted):
+  client = counted.test_client()
+  verify(counted)
+  venue, artist = counts(counted, Venue, 1), counts(counted, Artist, 1)
+
+  client.post('/shows/create', data={
+    'venue_id': 1, 'artist_id': 1, 'start_time': '2040-01-01 20:00:00'})
+  assert counts(counted, Venue, 1) == (venue[0] + 1, venue[1])
+  assert counts(counted, Artist, 1) == (artist[0] + 1, artist[1])
+  verify(counted)
+
+  # an edit rewrites the row but not its counts
+  response = client.post('/venues/1/edit', data={
+    'name': 'Renamed Hall', 'city': 'Austin', 'state': 'TX', 'address': '1 Main St',
+    'phone': '512-555-0100', 'genres': ['Jazz'], 'facebook_link': 'https://www.facebook.com/x',
+  })
+  assert response.status_code == 302
+  assert counts(counted, Venue, 1) == (venue[0] + 1, venue[1])
+  verify(counted)
+
+  assert client.delete('/venues/1').status_code == 200
+  verify(counted)
+  assert client.delete('/artists', json={'ids': [2]}).get_json()['success']
+  verify(counted)
+
+
+def test_show_moves_past_the_watermark(counted):
+  with counted.app_context():
+    # the counters last rolled an hour ago, and since then a show started
+    with db.engine.begin() as conn:
+      conn.execute(ShowCounterWatermark.__table__.update().values(
+        rolled_until=datetime.now() - timedelta(hours=1)))
+      show_counters.repair(conn)
+    with db.engine.begin() as conn:
+      show = {'venue_id': 1, 'artist_id': 1, 'start_time': datetime.now() - timedelta(minutes=30)}
+      conn.execute(Show.__table__.insert(), show)
+      show_counters.record(conn, [show])
+    stored = counts(counted, Venue, 1)
+    upcoming = dict((v['id'], v['num_upcoming_shows']) for a in venues_data() for v in a['venues'])
+  # stored as upcoming, read as past
+  assert upcoming[1] == stored[0] - 1
+  verify(counted)
+
+  result = counted.test_cli_runner().invoke(args=['counters', 'roll'])
+  assert result.output.startswith('1 shows rolled')
+  assert counts(counted, Venue, 1) == (stored[0] - 1, stored[1] + 1)
+  with counted.app_context():
+    assert dict((v['id'], v['num_upcoming_shows']) for a in venues_data() for v in a['venues']) == upcoming
+  verify(counted)
+
+
+def test_verify_reports_and_fixes_drift(counted):
+  with counted.app_context():
+    db.session.query(Venue).filter_by(id=2).update({Venue.upcoming_shows_count: Venue.upcoming_shows_count + 5})
+    db.session.commit()
+  runner = counted.test_cli_runner()
+  result = runner.invoke(args=['counters', 'verify'])
+  assert result.exit_code == 1 and result.output.startswith('Venue 2: upcoming')
+  assert runner.invoke(args=['counters', 'verify', '--fix']).output.endswith('1 rows repaired.\n')
+  verify(counted)
@@ -0,0 +1,57 @@
+#----------------------------------------------------------------------------#
+# Deleting venues and artists: their shows and genre tags go with them in
+# the database, no Show is loaded, and the other side's counters follow.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+
+from sqlalchemy import func
+
+from extensions import db
+from models import Artist, Show, ShowCounterWatermark, Venue, artist_genres, venue_genres
+
+
+def counters_match(model, key):
+  # the stored counters against counts taken from Show
+  rolled_until = db.session.query(ShowCounterWatermark.rolled_until).scalar()
+  upcoming = dict(db.session.query(Show.__table__.c[key], func.count()).filter(
+    Show.start_time >= rolled_until).group_by(Show.__table__.c[key]))
+  past = dict(db.session.query(Show.__table__.c[key], func.count()).filter(
+    Show.start_time < rolled_until).group_by(Show.__table__.c[key]))
+  return all((m.upcoming_shows_count, m.past_shows_count) == (upcoming.get(m.id, 0), past.get(m.id, 0))
+             for m in model.query)
+
+
+def test_delete_venue_cascades(app, client, seed, statements):
+  seed(venues=4, artists=4, shows=60)
+  del statements[:]
+  assert client.delete('/venues/1').get_json() == {'success': True}
+  assert not [s for s in statements if '"Show".id AS "Show_id"' in s]
+  with app.app_context():
+    assert Venue.query.get(1) is None
+    assert Show.query.filter_by(venue_id=1).count() == 0
+    assert db.session.query(venue_genres).filter(venue_genres.c.venue_id == 1).count() == 0
+    assert counters_match(Artist, 'artist_id')
+
+
+def test_bulk_delete_artists(app, client, seed, backdate):
+  seed(venues=4, artists=4, shows=60)
+  backdate(datetime(2020, 1, 1))
+  before = client.get('/artists').headers['Last-Modified']
+  response = client.delete('/artists', json={'ids': [1, 2, 999]})
+  assert response.get_json() == {'success': True, 'deleted': 2}
+  with app.app_context():
+    assert [a.id for a in Artist.query.order_by(Artist.id)] == [3, 4]
+    assert Show.query.filter(Show.artist_id.in_([1, 2])).count() == 0
+    assert db.session.query(artist_genres).filter(artist_genres.c.artist_id.in_([1, 2])).count() == 0
+    assert counters_match(Venue, 'venue_id')
+  # a client revalidating by date alone sees the deletion
+  assert client.get('/artists', headers={'If-Modified-Since': before}).status_code == 200
+
+
+def test_bulk_delete_rejects_bad_payloads(make_app):
+  client = make_app(DELETE_BATCH_MAX=2).test_client()
+  for payload in ({'ids': ['1']}, {'ids': 1}, [1, 2], None):
+    assert client.delete('/venues', json=payload).status_code == 400
+  assert client.delete('/venues', json={'ids': [1, 2, 3]}).status_code == 413
+  assert client.delete('/artists', json={'ids': [True]}).status_code == 400
@@ -0,0 +1,58 @@
+#----------------------------------------------------------------------------#
+# /export: full dumps as NDJSON or CSV, streamed with download headers.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+
+from models import Show, Venue
+
+
+def download(client, path):
+  response = client.get(path)
+  assert response.status_code == 200
+  body = response.get_data(as_text=True)
+  response.close()
+  return response, body
+
+
+def test_shows_ndjson(app, client, seed):
+  seed(venues=3, artists=3, shows=20)
+  response, body = download(client, '/export/shows.ndjson')
+  assert response.mimetype == 'application/x-ndjson'
+  assert response.headers['Content-Disposition'] == 'attachment; filename=shows.ndjson'
+
+  records = [json.loads(line) for line in body.splitlines()]
+  with app.app_context():
+    shows = Show.query.order_by(Show.start_time, Show.id).all()
+    expected = [{
+      'id': s.id, 'start_time': s.start_time.isoformat(), 'duration': s.duration,
+      'venue_id': s.venue_id, 'venue_name': s.venue.name,
+      'artist_id': s.artist_id, 'artist_name': s.artist.name,
+    } for s in shows]
+    venue_id = shows[0].venue_id
+  assert records == expected
+
+  _, body = download(client, '/export/shows.ndjson?venue_id={}'.format(venue_id))
+  assert [json.loads(line) for line in body.splitlines()] == [r for r in expected if r['venue_id'] == venue_id]
+
+
+def test_venues_csv(app, client, seed):
+  seed(venues=4, artists=1, shows=0)
+  response, body = download(client, '/export/venues.csv')
+  assert response.mimetype == 'text/csv'
+  assert response.headers['Content-Disposition'] == 'attachment; filename=venues.csv'
+
+  rows = list(csv.DictReader(io.StringIO(body)))
+  with app.app_context():
+    venues = Venue.query.order_by(Venue.id).all()
+    expected = [(str(v.id), v.name, ','.join(sorted(g.name for g in v.genres))) for v in venues]
+  assert [(r['id'], r['name'], r['genres']) for r in rows] == expected
+  assert all(r['genres'] for r in rows)
+
+
+def test_empty_csv_has_header(client):
+  _, body = download(client, '/export/artists.csv')
+  assert body.splitlines() == [
+    'id,name,city,state,phone,image_link,facebook_link,website_link,seeking_venue,seeking_description,genres']
@@ -0,0 +1,13 @@
+#----------------------------------------------------------------------------#
+# create_app() can be called more than once in a process.
+#----------------------------------------------------------------------------#
+
+def test_statements_counted_once_with_several_apps(make_app, app, client, seed, statements):
+  # a second app, as a test run or a reloading server creates
+  make_app()
+  seed()
+  del statements[:]
+  response = client.get('/venues/1')
+  response.close()
+  assert 'desc="{} queries"'.format(len(statements)) in response.headers['Server-Timing']
+
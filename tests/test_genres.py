@@ -0,0 +1,50 @@
+#----------------------------------------------------------------------------#
+# ?genre= on /venues and /artists lists only the members tagged with it.
+#----------------------------------------------------------------------------#
+
+import re
+
+import pytest
+
+from extensions import db
+from models import Artist, Genre, Venue
+
+
+def listed(client, page):
+  response = client.get(page)
+  assert response.status_code == 200
+  body = response.get_data(as_text=True)
+  response.close()
+  return set(int(id) for id in re.findall(r'href="{}/(\d+)"'.format(page.split('?')[0]), body))
+
+
+@pytest.mark.parametrize('model,page', [(Venue, '/venues'), (Artist, '/artists')])
+def test_genre_filter(app, client, seed, model, page):
+  seed(venues=15, artists=15, shows=0)
+  with app.app_context():
+    everyone = set(id for id, in db.session.query(model.id))
+    tagged = dict((g.name, set(id for id, in db.session.query(model.id).filter(model.genres.contains(g))))
+                  for g in Genre.query)
+  genre = max(tagged, key=lambda name: len(tagged[name]))
+  assert everyone > tagged[genre]
+
+  # the whole listing first, so a cached copy of it is around
+  assert listed(client, page) == everyone
+  assert listed(client, '{}?genre={}'.format(page, genre)) == tagged[genre]
+  assert listed(client, page + '?genre=Polka') == set()
+
+
+def test_genre_filter_follows_edits(app, client, seed):
+  seed(venues=0, artists=3, shows=0)
+  with app.app_context():
+    jazz = set(a.id for a in Artist.query if 'Jazz' in [g.name for g in a.genres])
+    artist = Artist.query.filter(~Artist.id.in_(jazz)).first()
+    artist_id, name, city, state, phone = artist.id, artist.name, artist.city, artist.state, artist.phone
+  assert listed(client, '/artists?genre=Jazz') == jazz
+
+  response = client.post('/artists/{}/edit'.format(artist_id), data={
+    'name': name, 'city': city, 'state': state, 'phone': phone,
+    'genres': ['Jazz'], 'facebook_link': 'https://www.facebook.com/x',
+  })
+  assert response.status_code == 302
+  assert listed(client, '/artists?genre=Jazz') == jazz | {artist_id}
@@ -0,0 +1,61 @@
+#----------------------------------------------------------------------------#
+# `flask import shows` rejects double bookings, against the table and
+# against earlier rows of the same file, and counts the shows it loads.
+#----------------------------------------------------------------------------#
+
+import io
+import json
+from datetime import datetime, timedelta
+
+from extensions import db
+from importer import Importer, read_records
+from models import Show, ShowCounterWatermark
+
+SHOWS = '''venue_id,artist_id,start_time,duration
+1,1,2030-01-01T20:00:00,120
+1,2,2030-01-01T21:00:00,60
+2,2,2030-01-01T21:00:00,60
+'''
+
+
+def import_shows(app, path):
+  rejects = io.StringIO()
+  with app.app_context():
+    stats = Importer(db.engine, db.metadata.tables, rejects=rejects).run('shows', read_records(str(path)))
+  return stats, [json.loads(line) for line in rejects.getvalue().splitlines()]
+
+
+def test_overlapping_shows_are_rejected(app, seed, tmp_path):
+  seed(venues=2, artists=2, shows=0)
+  path = tmp_path / 'shows.csv'
+  path.write_text(SHOWS)
+
+  stats, rejects = import_shows(app, path)
+  assert stats == {'inserted': 2, 'rejected': 1}
+  assert [(r['line'], r['reason']) for r in rejects] == [(3, 'overlaps another show of the venue')]
+
+  # the same file again clashes with what it booked the first time
+  stats, rejects = import_shows(app, path)
+  assert stats == {'inserted': 0, 'rejected': 3}
+  assert rejects[0]['reason'] == 'overlaps another show of the venue and of the artist'
+  with app.app_context():
+    assert db.session.query(Show).count() == 2
+
+
+def test_import_rolls_counters_on_the_app_interval(make_app, tmp_path):
+  app = make_app(COUNTERS_ROLL_INTERVAL=86400)
+  with app.app_context():
+    from seed import seed_database
+    seed_database(db.engine, dict((t.name, t) for t in db.metadata.sorted_tables), 2, 2, 0)
+    rolled_until = datetime.now() - timedelta(hours=1)
+    db.session.query(ShowCounterWatermark).update({ShowCounterWatermark.rolled_until: rolled_until})
+    db.session.commit()
+  path = tmp_path / 'shows.csv'
+  path.write_text(SHOWS)
+
+  result = app.test_cli_runner().invoke(args=['import', 'shows', str(path), '--rejects', str(tmp_path / 'rejects')])
+  assert result.exit_code == 0, result.output
+  with app.app_context():
+    # an hour is well within the interval, so the import left it alone
+    assert db.session.query(ShowCounterWatermark.rolled_until).scalar() == rolled_until
+  assert app.test_cli_runner().invoke(args=['counters', 'verify']).exit_code == 0
@@ -0,0 +1,32 @@
+#----------------------------------------------------------------------------#
+# The listing and detail pages issue a fixed number of statements, however
+# many shows there are.
+#----------------------------------------------------------------------------#
+
+from extensions import page_cache
+
+PAGES = ['/venues', '/venues/1', '/artists', '/artists/1', '/shows', '/shows?past=1', '/shows/calendar']
+
+
+def statement_counts(client, statements):
+  counts = {}
+  for page in PAGES:
+    # a cold cache, so each page loads its data
+    page_cache.backend.clear()
+    del statements[:]
+    response = client.get(page)
+    assert response.status_code == 200, page
+    # streamed pages run their queries as the body is read
+    response.get_data()
+    response.close()
+    counts[page] = len(statements)
+  return counts
+
+
+def test_statements_do_not_grow_with_shows(client, seed, statements):
+  # N shows, then 10N
+  seed(venues=4, artists=4, shows=40)
+  few = statement_counts(client, statements)
+  seed(venues=0, artists=0, shows=360, random_seed=1)
+  many = statement_counts(client, statements)
+  assert many == few
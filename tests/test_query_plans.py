@@ -0,0 +1,46 @@
+#----------------------------------------------------------------------------#
+# No read route reads the whole Show table or one of its indexes.
+#----------------------------------------------------------------------------#
+
+from explain import check_query_plans, full_scans
+from extensions import db
+
+POSTGRES_COUNT = [
+  'Aggregate  (cost=1.04..1.05 rows=1 width=8)',
+  '  ->  Index Only Scan using "ix_Show_start_time" on "Show"  (cost=0.42..1.03 rows=4 width=0)',
+]
+
+POSTGRES_RANGE = [
+  'Limit  (cost=0.42..8.45 rows=1 width=8)',
+  '  ->  Index Only Scan Backward using "ix_Show_start_time" on "Show"  (cost=0.42..8.45 rows=1 width=8)',
+  '        Index Cond: (start_time < \'2026-01-01 00:00:00\'::timestamp without time zone)',
+]
+
+POSTGRES_BITMAP = [
+  'Bitmap Heap Scan on "Show" "Show_1"  (cost=4.18..12.64 rows=4 width=16)',
+  '  Recheck Cond: (venue_id = 3)',
+  '  ->  Bitmap Index Scan on "ix_Show_venue_id_start_time"  (cost=0.00..4.18 rows=4 width=0)',
+  '        Index Cond: (venue_id = 3)',
+]
+
+
+def test_full_scans_in_postgres_plans():
+  assert full_scans(['Seq Scan on "Show"  (cost=0.00..1.04 rows=4 width=8)'], 'Show')
+  assert full_scans(POSTGRES_COUNT, 'Show') == [POSTGRES_COUNT[1]]
+  assert full_scans(POSTGRES_RANGE, 'Show') == []
+  assert full_scans(POSTGRES_BITMAP, 'Show') == []
+  assert full_scans(['Seq Scan on "ShowCounterWatermark"  (cost=0.00..1.01 rows=1 width=8)'], 'Show') == []
+
+
+def test_full_scans_in_sqlite_plans():
+  assert full_scans(['SCAN Show'], 'Show')
+  assert full_scans(['SCAN Show USING COVERING INDEX ix_Show_start_time'], 'Show')
+  assert full_scans(['SEARCH Show USING INDEX ix_Show_start_time (start_time>?)'], 'Show') == []
+  assert full_scans(['SCAN Venue USING INDEX ix_Venue_state_city'], 'Show') == []
+
+
+def test_read_routes_do_not_scan_shows(app, seed):
+  seed(venues=20, artists=20, shows=2000)
+  with app.app_context():
+    failures = check_query_plans(app, db.engine, {'venue_id': 1, 'artist_id': 1})
+  assert [(route, plan) for route, _, plan in failures] == []
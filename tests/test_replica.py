@@ -0,0 +1,56 @@
+#----------------------------------------------------------------------------#
+# Read-your-writes with a replica that lags: two SQLite files, the replica
+# a copy of the primary taken before the write.
+#----------------------------------------------------------------------------#
+
+import shutil
+
+import pytest
+
+from cache import MISSING
+from extensions import db, page_cache
+from seed import seed_database
+
+
+@pytest.fixture
+def replicated(make_app, tmp_path):
+  primary, replica = tmp_path / 'primary.db', tmp_path / 'replica.db'
+  app = make_app(SQLALCHEMY_DATABASE_URI='sqlite:///{}'.format(primary),
+                 SQLALCHEMY_BINDS={'replica': 'sqlite:///{}'.format(replica)})
+  with app.app_context():
+    tables = dict((t.name, t) for t in db.metadata.sorted_tables)
+    seed_database(db.engine, tables, 3, 3, 20)
+  shutil.copy(str(primary), str(replica))
+  return app
+
+
+def edit_venue(client, venue_id, name):
+  return client.post('/venues/{}/edit'.format(venue_id), data={
+    'name': name, 'city': 'Austin', 'state': 'TX', 'address': '1 Main St',
+    'phone': '512-555-0100', 'genres': ['Jazz'], 'facebook_link': 'https://www.facebook.com/x',
+  })
+
+
+def test_writer_reads_its_write(replicated):
+  writer, reader = replicated.test_client(), replicated.test_client()
+  original = reader.get('/venues/2').get_data()
+
+  assert edit_venue(writer, 2, 'Renamed Hall').status_code == 302
+  # another client still reads the replica, which has not seen the write;
+  # what it builds is not cached while the replica may lag
+  stale = reader.get('/venues/2')
+  assert b'Renamed Hall' not in stale.get_data()
+  assert page_cache.backend.get('venue:2') is MISSING
+
+  # the writer is pinned to the primary and bypasses the cache; its first
+  # page shows the flash message, which names the venue too
+  writer.get('/venues/2').get_data()
+  fresh = writer.get('/venues/2')
+  assert b'Renamed Hall' in fresh.get_data()
+  assert b'Renamed Hall' not in original
+
+
+def test_replica_reads_are_cached_without_writes(replicated):
+  client = replicated.test_client()
+  client.get('/venues/2')
+  assert page_cache.backend.get('venue:2') is not MISSING
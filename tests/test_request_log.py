@@ -0,0 +1,54 @@
+#----------------------------------------------------------------------------#
+# The request log: JSON lines written by a background thread, dropped
+# rather than waited on when the queue is full, successes sampled.
+#----------------------------------------------------------------------------#
+
+import json
+import logging
+import queue
+
+import pytest
+
+from extensions import request_log
+from requestlog import DroppingQueueHandler, SuccessSampler
+
+
+@pytest.fixture
+def log_file(make_app, tmp_path):
+  # an app that logs as in production, and the lines it wrote
+  path = tmp_path / 'fyyur.log'
+  app = make_app(DEBUG=False, LOG_FILE=str(path))
+
+  def lines():
+    request_log.close()
+    return [json.loads(line) for line in path.read_text().splitlines()]
+  yield app, lines
+  request_log.close()
+
+
+def test_requests_are_logged_as_json_lines(log_file, seed):
+  app, lines = log_file
+  seed()
+  app.test_client().get('/venues/1').close()
+  app.test_client().get('/venues/999').close()
+  requests = [line for line in lines() if 'route' in line]
+  assert [(r['route'], r['status']) for r in requests] == [
+    ('venues.show_venue', 200), ('venues.show_venue', 404)]
+  assert requests[0]['level'] == 'INFO'
+  assert requests[0]['path'] == '/venues/1'
+  assert requests[0]['queries'] >= 1
+  assert requests[0]['duration_ms'] >= requests[0]['db_ms']
+
+
+def test_full_queue_drops_records():
+  handler = DroppingQueueHandler(queue.Queue(1))
+  for _ in range(3):
+    handler.handle(logging.makeLogRecord({'msg': 'request'}))
+  assert handler.dropped == 2
+
+
+def test_sampling_keeps_errors():
+  sampler = SuccessSampler(0)
+  assert not sampler.filter(logging.makeLogRecord({'request': {'status': 200}}))
+  assert sampler.filter(logging.makeLogRecord({'request': {'status': 500}}))
+  assert sampler.filter(logging.makeLogRecord({'msg': 'not a request'}))
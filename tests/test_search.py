@@ -0,0 +1,62 @@
+#----------------------------------------------------------------------------#
+# Venue and artist search: ranked, paginated, and answered from the
+# in-process trigram index on databases other than Postgres.
+#----------------------------------------------------------------------------#
+
+import pytest
+
+from extensions import db, search_engine
+from models import Show, Venue
+from search import TrigramIndex, escape_like
+
+NAMES = ['Park Square Live Music & Coffee', 'The Musical Hop', 'Music', 'Musicians Hall', 'The Dueling Pianos Bar']
+
+
+@pytest.fixture
+def venues(make_app, monkeypatch):
+  # the fallback indexes are kept per model on the shared search engine
+  monkeypatch.setattr(search_engine, '_indexes', {})
+  app = make_app(SEARCH_PAGE_SIZE=2)
+  with app.app_context():
+    db.session.add_all(Venue(name=name, city='Austin', state='TX', address='1 Main St', phone='512-555-0100')
+                       for name in NAMES)
+    db.session.commit()
+  return app
+
+
+def test_index_ranks_exact_then_prefix_then_position():
+  index = TrigramIndex(enumerate(NAMES))
+  assert [NAMES[i] for i in index.search('music')] == [
+    'Music', 'Musicians Hall', 'The Musical Hop', 'Park Square Live Music & Coffee']
+  # short terms check every name
+  assert [NAMES[i] for i in index.search('Ho')] == ['The Musical Hop']
+
+
+def test_search_pages_in_rank_order(venues):
+  client = venues.test_client()
+  first = client.post('/venues/search', data={'search_term': 'music'}).get_data(as_text=True)
+  assert 'results for "music": 4' in first
+  assert first.index('<h5>Music</h5>') < first.index('<h5>Musicians Hall</h5>')
+  assert 'The Musical Hop' not in first
+  assert 'name="page" value="2"' in first
+
+  last = client.post('/venues/search', data={'search_term': 'music', 'page': 2}).get_data(as_text=True)
+  assert last.index('The Musical Hop') < last.index('Park Square Live Music &amp; Coffee')
+  assert 'name="page" value="3"' not in last
+  assert 'name="page" value="1"' in last
+
+
+def test_fallback_search_counts_upcoming_shows(venues, monkeypatch):
+  with venues.test_request_context():
+    hall = Venue.query.filter_by(name='Musicians Hall').one()
+    results = search_engine.search(Venue, Show.venue_id, 'hall')
+  assert results == {'count': 1, 'data': [{'id': hall.id, 'name': 'Musicians Hall', 'num_upcoming_shows': 0}]}
+
+  # the fallback never runs the Postgres query
+  monkeypatch.setattr(search_engine, '_search_postgres', None)
+  with venues.test_request_context():
+    assert search_engine.search(Venue, Show.venue_id, 'zzz') == {'count': 0, 'data': []}
+
+
+def test_like_wildcards_match_literally():
+  assert escape_like('100%_a\\b') == '100\\%\\_a\\\\b'
@@ -0,0 +1,22 @@
+#----------------------------------------------------------------------------#
+# flask seed: a request for more shows than the venues and artists can hold
+# stops with a usage error instead of drawing forever.
+#----------------------------------------------------------------------------#
+
+from extensions import db
+from models import Show
+
+
+def test_seed_stops_when_booked_up(app):
+  result = app.test_cli_runner().invoke(args=['seed', '--venues', '1', '--artists', '1', '--shows', '20000'])
+  assert result.exit_code == 2
+  assert 'booked up' in result.output
+  with app.app_context():
+    assert Show.query.count() == 0
+
+
+def test_seed_writes_what_was_asked(app):
+  result = app.test_cli_runner().invoke(args=['seed', '--venues', '2', '--artists', '3', '--shows', '10'])
+  assert result.exit_code == 0, result.output
+  with app.app_context():
+    assert db.session.query(Show).count() == 10
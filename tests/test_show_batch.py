@@ -0,0 +1,44 @@
+#----------------------------------------------------------------------------#
+# POST /shows/batch: valid shows go in together, the others are reported
+# by index with the reason they were left out.
+#----------------------------------------------------------------------------#
+
+from extensions import db
+from models import Show, Venue
+
+
+def test_batch_reports_each_show(app, client, seed):
+  seed(venues=2, artists=2, shows=0)
+  with app.app_context():
+    venue_name = Venue.query.get(2).name
+  response = client.post('/shows/batch', json={'shows': [
+    {'venue_id': 1, 'artist_id': 1, 'start_time': '2030-01-01T20:00:00', 'duration': 120},
+    # the venue is booked by the show above
+    {'venue_id': 1, 'artist_id': 2, 'start_time': '2030-01-01T21:00:00', 'duration': 60},
+    {'venue_name': venue_name, 'artist_id': 2, 'start_time': '2030-01-01T21:00:00'},
+    {'venue_id': 99, 'artist_id': 1, 'start_time': '2030-01-02T20:00:00'},
+    {'venue_id': 2, 'artist_id': 1},
+    'not a show',
+  ]})
+  assert response.status_code == 200
+  body = response.get_json()
+  assert (body['created'], body['rejected']) == (2, 4)
+  assert [(r['status'], r.get('error')) for r in body['results']] == [
+    ('created', None),
+    ('rejected', 'overlaps another show of the venue'),
+    ('created', None),
+    ('rejected', 'venue_id 99 not found'),
+    ('rejected', 'missing start_time'),
+    ('rejected', 'not an object'),
+  ]
+  with app.app_context():
+    assert sorted(db.session.query(Show.venue_id, Show.artist_id)) == [(1, 1), (2, 2)]
+    # the counters are kept in the same transaction
+    assert [v.upcoming_shows_count for v in Venue.query.order_by(Venue.id)] == [1, 1]
+
+
+def test_batch_limits(make_app):
+  client = make_app(SHOWS_BATCH_MAX=2).test_client()
+  assert client.post('/shows/batch', json={'shows': {}}).status_code == 400
+  assert client.post('/shows/batch', data='not json').status_code == 400
+  assert client.post('/shows/batch', json={'shows': [{}] * 3}).status_code == 413
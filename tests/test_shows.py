@@ -0,0 +1,62 @@
+#----------------------------------------------------------------------------#
+# /shows: upcoming and past shows, a page at a time behind a keyset cursor.
+#----------------------------------------------------------------------------#
+
+import re
+from datetime import datetime
+
+from extensions import db
+from helpers import decode_cursor
+from models import Show
+from shows import shows_data
+
+
+def walk(app, past):
+  # every page of shows_data, following the cursors
+  pages, after = [], None
+  while True:
+    with app.test_request_context():
+      data, cursor = shows_data(past, after)
+    pages.append(data)
+    if cursor is None:
+      return pages
+    after = decode_cursor(cursor)
+
+
+def test_pages_split_past_and_upcoming(make_app):
+  app = make_app(SHOWS_PAGE_SIZE=7)
+  with app.app_context():
+    from seed import seed_database
+    seed_database(db.engine, dict((t.name, t) for t in db.metadata.sorted_tables), 4, 4, 60)
+    now = datetime.now()
+    upcoming = Show.query.filter(Show.start_time >= now).order_by(Show.start_time, Show.id).all()
+    past = Show.query.filter(Show.start_time < now).order_by(Show.start_time.desc(), Show.id.desc()).all()
+  assert upcoming and past
+
+  for shows, is_past in ((upcoming, False), (past, True)):
+    pages = walk(app, is_past)
+    assert all(len(page) == 7 for page in pages[:-1]) and 0 < len(pages[-1]) <= 7
+    listed = [(s['start_time'], s['venue_id'], s['artist_id']) for page in pages for s in page]
+    assert listed == [(s.start_time, s.venue_id, s.artist_id) for s in shows]
+
+
+def test_next_page_link(make_app):
+  app = make_app(SHOWS_PAGE_SIZE=5)
+  client = app.test_client()
+  with app.app_context():
+    from seed import seed_database
+    seed_database(db.engine, dict((t.name, t) for t in db.metadata.sorted_tables), 3, 3, 40)
+  first = client.get('/shows?past=1').get_data(as_text=True)
+  link = re.search(r'href="(/shows\?[^"]*after=[^"]+)"', first).group(1).replace('&amp;', '&')
+  response = client.get(link)
+  assert response.status_code == 200
+  second = response.get_data(as_text=True)
+  response.close()
+  times = lambda page: re.findall(r'<h4>(.*?)</h4>', page)
+  assert len(times(first)) == 5 and times(second)
+  assert not set(times(first)) & set(times(second))
+
+
+def test_bad_cursor_is_refused(client):
+  assert client.get('/shows?after=yesterday').status_code == 400
+  assert client.get('/shows?after=2020-01-01T00:00:00_x').status_code == 400
@@ -0,0 +1,61 @@
+#----------------------------------------------------------------------------#
+# Slow-query log: statements over SLOW_QUERY_MS are logged with the route
+# that issued them, and only side-effect-free reads are run again by
+# EXPLAIN ANALYZE.
+#----------------------------------------------------------------------------#
+
+import logging
+
+from slowqueries import explain_prefix, is_select, summarize
+
+
+def test_reads_with_side_effects_are_not_analyzed():
+  assert explain_prefix('SELECT id FROM "Show" WHERE venue_id = %(venue_id)s') == 'EXPLAIN (ANALYZE, BUFFERS) '
+  assert explain_prefix('SELECT id FROM "Show" FOR UPDATE') == 'EXPLAIN '
+  assert explain_prefix('SELECT id FROM "Show" FOR NO KEY UPDATE SKIP LOCKED') == 'EXPLAIN '
+  assert explain_prefix('SELECT id FROM "Show" for share') == 'EXPLAIN '
+  assert explain_prefix("SELECT nextval('\"Show_id_seq\"')") == 'EXPLAIN '
+  assert explain_prefix("SELECT setval('\"Show_id_seq\"', 1)") == 'EXPLAIN '
+  assert explain_prefix('SELECT pg_advisory_xact_lock(1)') == 'EXPLAIN '
+  assert not is_select('UPDATE "Show" SET duration = 60')
+
+
+def test_slow_statements_are_logged_with_their_route(make_app, seed, caplog):
+  # every statement is over a threshold this low
+  app = make_app(SLOW_QUERY_MS=1e-6)
+  seed()
+  caplog.set_level(logging.WARNING)
+  caplog.clear()
+  app.test_client().get('/venues/1').close()
+  queries = [r.query for r in caplog.records if getattr(r, 'query', None)]
+  assert queries
+  for query in queries:
+    assert (query['route'], query['view'], query['url']) == ('venues.show_venue', 'show_venue', 'GET /venues/1')
+    assert query['duration_ms'] >= 0
+    # plans are only captured on Postgres
+    assert 'plan' not in query
+
+
+def test_executemany_parameters_are_summarized(make_app, seed, caplog):
+  make_app(SLOW_QUERY_MS=1e-6)
+  caplog.set_level(logging.WARNING)
+  caplog.clear()
+  seed(venues=3, artists=3, shows=40)
+  inserts = [r.query for r in caplog.records
+             if getattr(r, 'query', None) and r.query['statement'].startswith('INSERT INTO "Show"')]
+  assert len(inserts) == 1
+  parameters = inserts[0]['parameters']
+  assert parameters['rows'] == 40 and parameters['first']
+
+  assert summarize({'id': 1}, False) == {'id': 1}
+  assert summarize([], True) == {'rows': 0, 'first': None}
+
+
+def test_off_without_threshold(make_app, seed, caplog):
+  make_app(SLOW_QUERY_MS=1e-6)
+  app = make_app(SLOW_QUERY_MS=0)
+  seed()
+  caplog.set_level(logging.WARNING)
+  caplog.clear()
+  app.test_client().get('/venues/1').close()
+  assert not [r for r in caplog.records if getattr(r, 'query', None)]
@@ -0,0 +1,41 @@
+#----------------------------------------------------------------------------#
+# Streamed listings: compressed on the fly, validated by a weak ETag, and
+# measured once the body has been sent.
+#----------------------------------------------------------------------------#
+
+import gzip
+import logging
+
+from extensions import metrics
+
+
+def test_streamed_listing_is_compressed(client, seed):
+  seed()
+  response = client.get('/artists', headers={'Accept-Encoding': 'gzip'})
+  assert response.headers['Content-Encoding'] == 'gzip'
+  assert 'Accept-Encoding' in response.headers.get_all('Vary')
+  assert b'</html>' in gzip.decompress(response.get_data())
+  response.close()
+
+  etag = response.headers['ETag']
+  assert etag.startswith('W/')
+  response = client.get('/artists', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+  assert response.status_code == 304
+
+
+def test_streamed_listing_is_measured_when_sent(client, seed, caplog):
+  seed()
+  caplog.set_level(logging.INFO)
+  # metrics is shared by every app the tests create
+  queries = metrics.queries.get('artists.artists', 0)
+  response = client.get('/artists')
+  # the listing query runs as the body is read; nothing is recorded yet
+  assert metrics.queries.get('artists.artists', 0) == queries
+  response.get_data()
+  response.close()
+
+  logged = [r.request for r in caplog.records if getattr(r, 'request', None)]
+  assert [r['route'] for r in logged] == ['artists.artists']
+  # the validators and the listing itself
+  assert logged[0]['queries'] == metrics.queries['artists.artists'] - queries >= 2
+  assert logged[0]['render_ms'] > 0
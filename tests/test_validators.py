@@ -0,0 +1,85 @@
+#----------------------------------------------------------------------------#
+# Conditional GET: listing ETags change with every write, deletions
+# included, and a 304 is answered from the validators alone.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+from extensions import db
+from helpers import page_validators
+from models import DeletionCounter, Show, Venue
+
+
+def test_unchanged_listing_is_not_modified(client, seed):
+  seed()
+  etag = client.get('/venues').headers['ETag']
+  response = client.get('/venues', headers={'If-None-Match': etag})
+  assert response.status_code == 304
+
+
+def test_deletion_changes_listing_etag(app, client, seed):
+  seed()
+  before = client.get('/venues').headers['ETag']
+  response = client.delete('/venues', json={'ids': [1]})
+  assert response.get_json() == {'success': True, 'deleted': 1}
+  response = client.get('/venues', headers={'If-None-Match': before})
+  assert response.status_code == 200
+  assert response.headers['ETag'] != before
+  with app.app_context():
+    counts = dict(db.session.query(DeletionCounter.table_name, DeletionCounter.deleted))
+  assert counts == {'Venue': 1, 'Show': 1}
+
+
+def test_nothing_deleted_keeps_listing_etag(client, seed):
+  seed()
+  before = client.get('/venues').headers['ETag']
+  client.delete('/venues', json={'ids': [999]})
+  assert client.get('/venues', headers={'If-None-Match': before}).status_code == 304
+
+
+def test_cached_body_matches_etag(app, client, seed):
+  # a change the write handlers did not invalidate, as when a stale body
+  # is cached after the invalidation: the new ETag rebuilds the body
+  seed()
+  before = client.get('/venues/1')
+  with app.app_context():
+    venue = Venue.query.get(1)
+    venue.name = 'Renamed Hall'
+    db.session.commit()
+  after = client.get('/venues/1')
+  assert after.headers['ETag'] != before.headers['ETag']
+  assert b'Renamed Hall' in after.get_data()
+
+
+def test_deletion_changes_listing_last_modified(app, client, seed, backdate):
+  # a client that revalidates by date alone
+  seed()
+  backdate(datetime(2020, 1, 1))
+  before = client.get('/venues').headers['Last-Modified']
+  client.delete('/venues', json={'ids': [1]})
+  response = client.get('/venues', headers={'If-Modified-Since': before})
+  assert response.status_code == 200
+  # once the deletion's second is over, it is the page's Last-Modified
+  backdate(datetime.utcnow() - timedelta(seconds=5), models=())
+  response = client.get('/venues', headers={'If-Modified-Since': before})
+  assert response.status_code == 200
+  with app.app_context():
+    deleted_at = db.session.query(DeletionCounter.deleted_at).filter_by(table_name='Venue').scalar()
+  assert response.last_modified == deleted_at.replace(microsecond=0)
+
+
+def test_show_deleted_with_artist_changes_venue_last_modified(app, client, seed, backdate):
+  seed()
+  backdate(datetime(2020, 1, 1))
+  with app.app_context():
+    venue_id, artist_id = db.session.query(Show.venue_id, Show.artist_id).first()
+  page = '/venues/{}'.format(venue_id)
+  before = client.get(page).headers['Last-Modified']
+  client.delete('/artists', json={'ids': [artist_id]})
+  assert client.get(page, headers={'If-Modified-Since': before}).status_code == 200
+
+
+def test_change_in_current_second_has_no_last_modified():
+  assert page_validators([datetime.utcnow()])[1] is None
+  earlier = datetime.utcnow() - timedelta(seconds=2)
+  assert page_validators([earlier])[1] == earlier
@@ -0,0 +1,52 @@
+#----------------------------------------------------------------------------#
+# /venues: one aggregated query, its rows grouped by city and state.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+
+from extensions import page_cache
+from models import Show, Venue
+from venues import venues_data
+
+
+def test_listing_is_one_query(app, seed, statements):
+  seed(venues=8, artists=4, shows=60)
+  with app.app_context():
+    del statements[:]
+    venues_data()
+  assert len(statements) == 1
+
+
+def test_listing_page_queries_do_not_grow_with_venues(client, seed, statements):
+  def count():
+    page_cache.backend.clear()
+    del statements[:]
+    client.get('/venues').get_data()
+    return len(statements)
+  seed(venues=2, artists=2, shows=10)
+  few = count()
+  seed(venues=20, artists=0, shows=0, random_seed=1)
+  assert count() == few
+
+
+def test_listing_groups_by_city_and_state(app, seed):
+  seed(venues=12, artists=4, shows=60)
+  with app.app_context():
+    areas = venues_data()
+    now = datetime.now()
+    expected = dict(
+      (v.id, ((v.city, v.state), sum(1 for s in v.shows if s.start_time >= now)))
+      for v in Venue.query)
+    assert Show.query.count() == 60
+
+  places = [(a['city'], a['state']) for a in areas]
+  # twelve venues in fewer places, so some share one
+  assert len(places) < 12
+  assert len(places) == len(set(places)) and places == sorted(places, key=lambda p: (p[1], p[0]))
+  listed = dict(
+    (v['id'], ((a['city'], a['state']), v['num_upcoming_shows']))
+    for a in areas for v in a['venues'])
+  assert listed == expected
+  for area in areas:
+    names = [v['name'] for v in area['venues']]
+    assert names == sorted(names)
@@ -0,0 +1,260 @@
+#----------------------------------------------------------------------------#
+# Venues blueprint: the venue listing, search, detail page and forms.
+#----------------------------------------------------------------------------#
+
+import traceback
+from datetime import datetime
+from itertools import groupby
+
+from flask import Blueprint, abort, current_app, flash, g, jsonify, redirect, render_template, request, url_for
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload
+
+from extensions import db, page_cache, search_engine, show_counters
+from helpers import bulk_delete, conditional, delete_members, deletion_time, forget_deleted, genre_members, last_started, split_shows, table_validators, venue_cache_keys
+from models import Artist, Genre, Show, Venue, venue_genres
+from routing import read_only
+
+bp = Blueprint('venues', __name__)
+
+#----------------------------------------------------------------------------#
+# Page data.
+#----------------------------------------------------------------------------#
+
+def venues_query(genre=None):
+  # every venue (of genre, if given) with its number of upcoming shows, read
+  # from the counters on the row and ordered so that venues of the same city
+  # and state are adjacent.
+  moved = show_counters.moved('venue_id', datetime.now())
+  query = db.session.query(
+    Venue.id, Venue.name, Venue.city, Venue.state,
+    (Venue.upcoming_shows_count - func.coalesce(moved.c.moved, 0)).label('num_upcoming_shows')
+  ).outerjoin(moved, moved.c.member_id == Venue.id)
+  if genre:
+    query = query.filter(Venue.id.in_(genre_members(venue_genres, genre)))
+  return query.order_by(Venue.state, Venue.city, Venue.name)
+
+def venues_from_rows(rows):
+  data = []
+  for (city, state), rows in groupby(rows, key=lambda q: (q.city, q.state)):
+    data.append({
+      'city': city,
+      'state': state,
+      'venues': [{
+        'id': q.id,
+        'name': q.name,
+        'num_upcoming_shows': q.num_upcoming_shows,
+      } for q in rows],
+    })
+  return data
+
+def venues_data(genre=None):
+  return venues_from_rows(venues_query(genre).all())
+
+def venue_data(venue_id):
+  # the venue, its shows and each show's artist come back in one joined
+  # query, and its genres in a second one
+  query = Venue.query.options(
+    joinedload(Venue.shows).joinedload(Show.artist),
+    selectinload(Venue.genres),
+  ).filter(Venue.id == venue_id).first()
+  if query is None:
+    return None
+
+  data = venue_fields(query, [g.name for g in query.genres])
+  data.update(split_shows(query.shows, lambda s: {
+    'artist_id': s.artist_id,
+    'artist_name': s.artist.name,
+    'artist_image_link': s.artist.image_link,
+  }))
+
+  return data
+
+def venue_fields(venue, genres):
+  # venue is a Venue or a row of the Venue table
+  data = {}
+  data['id'] = venue.id
+  data['name'] = venue.name
+  data['genres'] = sorted(genres)
+  data['address'] = venue.address
+  data['city'] = venue.city
+  data['state'] = venue.state
+  data['phone'] = venue.phone
+  data['website'] = venue.website_link
+  data['facebook_link'] = venue.facebook_link
+  data['seeking_talent'] = venue.seeking_talent
+  data['seeking_description'] = venue.seeking_description
+  data['image_link'] = venue.image_link
+  return data
+
+#----------------------------------------------------------------------------#
+# Validators.
+#----------------------------------------------------------------------------#
+
+def venue_validators(venue_id):
+  return db.session.query(
+    func.max(Venue.updated_at), func.max(Show.updated_at), func.max(Artist.updated_at),
+    # the count catches a show deleted with its artist; the time of
+    # that deletion is what Last-Modified sees
+    func.count(Show.id), deletion_time(Show), last_started(),
+  ).outerjoin(Show, Show.venue_id == Venue.id).outerjoin(Artist, Show.artist_id == Artist.id
+  ).filter(Venue.id == venue_id).group_by(Venue.id)
+
+def venues_validators():
+  return table_validators(Venue, Show, shows_start=True)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@bp.route('/venues')
+@read_only
+@conditional(venues_validators)
+def venues():
+  # ?genre=Jazz lists only the venues tagged with that genre
+  genre = request.args.get('genre', '')
+  data = page_cache.get_or_build(page_cache.namespace('venues') + genre, lambda: venues_data(genre), g.get('etag'))
+  return render_template('pages/venues.html', areas=data, genre=genre)
+
+@bp.route('/venues/search', methods=['POST'])
+@read_only
+def search_venues():
+  # partial, case-insensitive search on venue names, ranked and paginated.
+  # seach for Hop should return "The Musical Hop".
+  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+  search_term = request.form.get('search_term', '')
+  page = request.form.get('page', 1, type=int)
+  per_page = current_app.config['SEARCH_PAGE_SIZE']
+  response = search_engine.search(Venue, Show.venue_id, search_term,
+    limit=per_page, offset=(max(page, 1) - 1) * per_page)
+  response['page'] = page
+  response['has_next'] = page * per_page < response['count']
+
+  return render_template('pages/search_venues.html', results=response, search_term=search_term)
+
+@bp.route('/venues/<int:venue_id>')
+@read_only
+@conditional(venue_validators)
+def show_venue(venue_id):
+  # shows the venue page with the given venue_id
+  data = page_cache.get_or_build('venue:{}'.format(venue_id), lambda: venue_data(venue_id), g.get('etag'))
+  if data is None:
+    abort(404)
+  return render_template('pages/show_venue.html', venue=data)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  from forms import VenueForm
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  
+  # TODO: insert form data as a new Venue record in the db, instead
+  # TODO: modify data to be the data object returned from db insertion
+  
+  try:
+    name = request.form['name']
+    address = request.form['address']
+    city = request.form['city']
+    state = request.form['state']
+    phone = request.form['phone']
+    genres = Genre.from_names(request.form.getlist('genres'))
+    facebook_link = request.form['facebook_link']
+    venue = Venue(name = name, address = address, city = city, state = state, phone = phone, genres = genres, facebook_link = facebook_link )
+    db.session.add(venue)
+    db.session.commit()
+    search_engine.invalidate(Venue)
+    page_cache.invalidate_namespace('venues')
+    flash('Venue ' + request.form['name'] + ' was successfully listed!')
+  except:
+    db.session.rollback()
+    flash('Error! Venue ' + request.form['name'] + ' could not be listed!')
+  finally:
+    db.session.close()
+
+  # on successful db insert, flash success
+  
+  # TODO: on unsuccessful db insert, flash an error instead.
+  # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+  # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+  return render_template('pages/home.html')
+
+@bp.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+  # TODO: Complete this endpoint for taking a venue_id, and using
+  # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+
+  # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+  # clicking that button delete it from the db then redirect the user to the homepage
+  try:
+    name, = db.session.query(Venue.name).filter(Venue.id == venue_id).one()
+    _, keys = delete_members(Venue, [venue_id])
+    db.session.commit()
+    forget_deleted(Venue, keys)
+    flash('Venue ' + name +' was successfully deleted!')
+  except:
+    db.session.rollback()
+    traceback.print_exc()
+    flash('Error! Venue could not be deleted!')
+    return jsonify({'success': False})
+  finally:
+    db.session.close()
+  return jsonify({ 'success': True })
+
+@bp.route('/venues', methods=['DELETE'])
+def delete_venues():
+  return bulk_delete(Venue)
+
+#  Update
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+  from forms import VenueForm
+  form = VenueForm()
+  venue = Venue.query.get(venue_id)
+  
+  # TODO: populate form with values from venue with ID <venue_id>
+  return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  # TODO: take values from the form submitted, and update existing
+  # venue record with ID <venue_id> using the new attributes
+  try:
+    name = request.form['name']
+    city = request.form['city']
+    state = request.form['state']
+    phone = request.form['phone']
+    genres = Genre.from_names(request.form.getlist('genres'))
+    facebook_link = request.form['facebook_link']
+    venue = Venue.query.get(venue_id)
+    venue.name = name
+    venue.city = city
+    venue.state = state
+    venue.phone = phone
+    venue.genres = genres
+    venue.facebook_link = facebook_link
+    # set explicitly: a change to genres alone does not trigger onupdate
+    venue.updated_at = datetime.utcnow()
+    keys = venue_cache_keys(venue_id)
+    db.session.commit()
+    search_engine.invalidate(Venue)
+    page_cache.invalidate(*keys)
+    page_cache.invalidate_namespace('venues')
+    page_cache.invalidate_namespace('shows')
+    flash('Venue ' + request.form['name'] + ' are successfully edited!')
+  except:
+    db.session.rollback()
+    flash('Error! Venue ' + request.form['name'] + ' could not be edited!')
+  finally:
+    db.session.close()
+  return redirect(url_for('.show_venue', venue_id=venue_id))